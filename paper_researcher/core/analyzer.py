@@ -1,9 +1,10 @@
 """
 AI分析模块 - 使用豆包API进行论文分析
 """
-import json
+import re
 import asyncio
-from typing import List, Dict, Any, Optional
+import hashlib
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from openai import AsyncOpenAI
 from rich.console import Console
@@ -11,18 +12,257 @@ from rich.progress import Progress
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type, before_sleep_log, RetryError
 import logging
 
+try:
+    import json5
+except ImportError:
+    json5 = None
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
 from core.config import (
     DOUBAO_API_KEY, 
     DOUBAO_BASE_URL, 
     DOUBAO_MODEL_NAME,
+    DOUBAO_MODEL_NAME_LITE,
     MAX_CONCURRENT_REQUESTS,
+    ANALYSIS_WORKERS,
+    PAPER_TIMEOUT,
+    SCREENING_BATCH_SIZE,
+    ANALYSIS_TOKEN_BUDGET,
+    ANALYSIS_MAX_CHARS,
+    ENABLE_LLM_CACHE,
+    ENABLE_KEYWORD_PREFILTER,
+    ENABLE_STREAMING,
+    ENABLE_JSON_MODE,
     IMPROVEMENT_CATEGORIES
 )
 from core.db import db
-from utils.pdf_handler import PDFHandler
+from utils.pdf_handler import get_pdf_handler
+from utils import json_utils
 
 console = Console()
 
+# 匹配模型输出首尾包裹JSON的 ``` 代码块标记（模块加载时编译一次）
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.I)
+
+
+def _extract_json_block(text: str) -> Optional[str]:
+    """通过括号计数定位文本中最外层的 {...} 或 [...] 片段"""
+    start = -1
+    for i, ch in enumerate(text):
+        if ch in '{[':
+            start = i
+            break
+    if start == -1:
+        return None
+
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in '{[':
+            depth += 1
+        elif ch in '}]':
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+def _robust_parse_json(text: str) -> Any:
+    """
+    宽松解析LLM返回的JSON
+
+    依次尝试: 去除代码块标记后直接解析 → 提取最外层JSON片段解析 → json5宽松解析
+    """
+    text = _FENCE_RE.sub('', text)
+    try:
+        return json_utils.loads(text)
+    except json_utils.JSONDecodeError as e:
+        error = e
+
+    block = _extract_json_block(text)
+    if block is not None:
+        try:
+            return json_utils.loads(block)
+        except json_utils.JSONDecodeError as e:
+            error = e
+            text = block
+
+    if json5 is None:
+        raise error
+    try:
+        return json5.loads(text)
+    except ValueError:
+        raise error
+
+
+# 关键词预筛选时忽略的常见虚词
+_PREFILTER_STOPWORDS = frozenset({
+    'a', 'an', 'the', 'of', 'for', 'and', 'or', 'in', 'on', 'at', 'to', 'by',
+    'with', 'via', 'from', 'into', 'using', 'based', 'towards', 'toward',
+})
+
+
+def _keyword_pattern(keywords: Optional[List[str]]) -> Optional[re.Pattern]:
+    """
+    构建检索关键词预筛选正则（大小写不敏感）
+    
+    按单词匹配：关键词拆分为有意义的单词，命中任意一个即视为命中。
+    单词去掉复数词尾后按前缀匹配（"models" 可命中 "model"、"modeling"），
+    全大写缩写按整词匹配并允许复数（"LLM" 可命中 "LLMs"）。
+    只使用ASCII关键词：关键词生成失败回退为中文主题时不做预筛选，避免误判。
+    """
+    terms = set()
+    for kw in keywords or []:
+        if not kw.isascii():
+            continue
+        for word in re.findall(r'[A-Za-z0-9]+', kw):
+            lower = word.lower()
+            if lower in _PREFILTER_STOPWORDS:
+                continue
+            if word.isupper() and len(word) <= 5:
+                # 缩写（如 LLM、RL、GAN）：整词匹配，允许复数
+                terms.add(re.escape(lower) + r's?\b')
+            elif len(lower) >= 3:
+                stem = re.sub(r'(?:es|s)$', '', lower) if len(lower) > 4 else lower
+                terms.add(re.escape(stem))
+    if not terms:
+        return None
+    return re.compile(r'\b(?:' + '|'.join(sorted(terms)) + ')', re.I)
+
+
+async def _run_db(func, *args):
+    """在线程池中执行阻塞的数据库操作，避免阻塞事件循环中的其他并发任务"""
+    return await asyncio.to_thread(func, *args)
+
+
+# ==================== 提示词 ====================
+# 系统提示词保持逐字不变并置于消息首位，动态内容只放在其后的用户消息中，
+# 以便支持前缀缓存的API服务端复用相同前缀
+
+SYSTEM_SCREEN_PROMPT = """你是一个专业的学术论文筛选助手，擅长判断论文与特定研究主题的相关性。
+请判断用户给出的论文是否与指定的研究主题相关。
+
+请按以下JSON格式输出你的判断:
+{
+    "relevance_score": 0-100的整数,  // 相关度分数，100表示完全相关
+    "is_relevant": true/false,  // 是否与主题相关（分数>60视为相关）
+    "reason": "简要说明判断理由（2-3句话）"
+}
+
+注意：只输出JSON，不要输出其他内容。"""
+
+SYSTEM_SCREEN_BATCH_PROMPT = """你是一个专业的学术论文筛选助手，擅长判断论文与特定研究主题的相关性。
+请逐篇判断用户给出的论文列表（JSON数组，每篇包含id、title、abstract）是否与指定的研究主题相关。
+
+请按以下JSON格式输出你的判断，results中每篇论文一项，id与输入保持一致:
+{
+    "results": [
+        {
+            "id": "论文id",
+            "relevance_score": 0-100的整数,  // 相关度分数，100表示完全相关
+            "is_relevant": true/false,  // 是否与主题相关（分数>60视为相关）
+            "reason": "简要说明判断理由（2-3句话）"
+        }
+    ]
+}
+
+注意：只输出JSON，不要输出其他内容。"""
+
+SYSTEM_ANALYSIS_PROMPT = """你是一位专业的学术论文分析专家，擅长提取论文的核心要素和创新点。
+请结合用户给出的研究主题，对论文进行深度分析，提取核心要素。
+
+请按以下JSON格式输出分析结果:
+{
+    "problem_definition": "该方法试图解决的具体问题（1-2句话）",
+    "mathematical_modeling": "关键公式、优化目标、约束条件（简要描述）",
+    "core_innovation": "核心创新点（不超过3个关键词或短语）",
+    "theoretical_guarantee": "是否有理论分析（如收敛性、复杂度），简要说明",
+    "experimental_design": "数据集、Baseline、评价指标",
+    "quantitative_results": "相对提升（如'+2.3%'）、效率改进等量化效果",
+    "limitations": "作者承认的局限性+你可以发现的可改进点",
+    "innovation_ideas": "基于该论文，你可以提出的创新思路（至少3个）",
+    "improvement_category": "改进方向分类，必须是以下之一: 数学改进、结构改进、自适应方法、理论分析、应用扩展、效率优化、其他"
+}
+
+注意：
+1. 只输出JSON格式，不要输出其他内容
+2. 如果某部分信息在论文中未明确提及，填写"未明确提及"
+3. improvement_category必须从给定列表中选择"""
+
+SYSTEM_KEYWORDS_PROMPT = """你是一位专业的学术论文检索专家，擅长将研究主题转化为有效的检索关键词。
+请根据用户给出的研究主题，生成适合在arXiv上检索的英文关键词。
+
+要求：
+1. 生成英文关键词或短语
+2. 关键词应该覆盖主题的核心概念
+3. 考虑使用同义词或相关术语
+4. 优先使用学术界常用的术语
+5. 如果主题是中文，请准确翻译为英文学术术语
+6. 覆盖与核心概念强关联的同领域技术 / 方法术语
+7. 包含核心方法 / 技术的变体、改进型、衍生型术语
+8. 涵盖支撑核心概念的底层理论 / 数学基础术语
+9. 补充 arXiv 对应学科的领域通用术语
+10. 包含核心技术的关键参数 / 核心模块术语
+
+
+请按以下JSON格式输出：
+{
+    "keywords": ["keyword1", "keyword2", "keyword3"]
+}
+
+注意：
+- 只输出JSON格式
+- 关键词必须是英文
+- 不要包含解释性文字"""
+
+# 用户消息模板（仅包含动态内容）
+SCREEN_USER_TEMPLATE = """研究主题: {topic}
+
+论文标题: {title}
+
+论文摘要: {abstract}"""
+
+SCREEN_BATCH_USER_TEMPLATE = """研究主题: {topic}
+
+论文列表:
+{papers}"""
+
+ANALYSIS_USER_TEMPLATE = """研究主题: {topic}
+
+论文标题: {title}
+
+论文内容:
+{content}"""
+
+KEYWORDS_USER_TEMPLATE = '研究主题: "{topic}"'
+
+# JSON模式，要求模型直接输出合法JSON对象
+JSON_RESPONSE_FORMAT = {"type": "json_object"}
+
+# 预构建的系统消息，各次调用按引用复用
+_SYSTEM_MSG_SCREEN = {"role": "system", "content": SYSTEM_SCREEN_PROMPT}
+_SYSTEM_MSG_SCREEN_BATCH = {"role": "system", "content": SYSTEM_SCREEN_BATCH_PROMPT}
+_SYSTEM_MSG_ANALYSIS = {"role": "system", "content": SYSTEM_ANALYSIS_PROMPT}
+_SYSTEM_MSG_KEYWORDS = {"role": "system", "content": SYSTEM_KEYWORDS_PROMPT}
+
+# 进程内关键词缓存：研究主题 -> 关键词
+_KEYWORDS_CACHE: Dict[str, Tuple[str, ...]] = {}
+
 
 @dataclass
 class PaperAnalysis:
@@ -49,7 +289,9 @@ class PaperAnalyzer:
             base_url=DOUBAO_BASE_URL
         )
         self.model = DOUBAO_MODEL_NAME
+        self.model_lite = DOUBAO_MODEL_NAME_LITE or DOUBAO_MODEL_NAME
         self.semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self._enc = self._load_encoding()
         # Token 使用统计
         self.token_stats = {
             'prompt_tokens': 0,
@@ -58,6 +300,55 @@ class PaperAnalyzer:
             'api_calls': 0
         }
     
+    @staticmethod
+    def _load_encoding():
+        """加载tokenizer，不可用时返回None（回退为按字符截断）"""
+        if tiktoken is None:
+            return None
+        try:
+            return tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            console.log(f"[yellow]tokenizer加载失败，改为按字符截断: {e}")
+            return None
+    
+    def _truncate_content(self, content: str) -> str:
+        """按Token预算截断论文内容"""
+        if self._enc is None:
+            return content[:ANALYSIS_MAX_CHARS]
+        
+        # 每个token至少占1个UTF-8字节，字节数不超预算时无需分词
+        if len(content.encode('utf-8')) <= ANALYSIS_TOKEN_BUDGET:
+            return content
+        
+        ids = self._enc.encode(content, disallowed_special=())
+        if len(ids) <= ANALYSIS_TOKEN_BUDGET:
+            return content
+        return self._enc.decode(ids[:ANALYSIS_TOKEN_BUDGET])
+    
+    async def _run_bounded(self, func, items: List[Any]) -> List[Any]:
+        """
+        有界并发执行 func(item)
+        
+        先获取许可再创建任务，同一时间最多只存在 MAX_CONCURRENT_REQUESTS 个待执行协程，
+        避免一次性为所有论文创建协程并持有其提示词。超时由 _call_api 对每次实际请求单独控制
+        （排队等待API并发许可的时间不计入），单个任务的异常不会影响其他任务
+        
+        Args:
+            func: 处理单个元素的协程函数
+            items: 待处理元素列表
+        
+        Returns:
+            与items一一对应的结果列表，失败或超时的位置为异常对象
+        """
+        limiter = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        tasks = []
+        for item in items:
+            await limiter.acquire()
+            task = asyncio.create_task(func(item))
+            task.add_done_callback(lambda _: limiter.release())
+            tasks.append(task)
+        return await asyncio.gather(*tasks, return_exceptions=True)
+    
     def get_token_stats(self) -> Dict[str, int]:
         """获取Token使用统计"""
         return self.token_stats.copy()
@@ -75,48 +366,114 @@ class PaperAnalyzer:
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=4, max=10)
     )
-    async def _call_api(self, messages: List[Dict[str, str]], temperature: float = 0.3) -> tuple:
+    async def _call_api(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.3,
+        response_format: Optional[Dict[str, str]] = None,
+        model: Optional[str] = None
+    ) -> tuple:
         """
         调用豆包API
         
         Args:
             messages: 消息列表
             temperature: 温度参数
+            response_format: 结构化输出格式，如 {"type": "json_object"}
+            model: 使用的模型，默认为主模型
         
         Returns:
-            (API响应文本, usage统计字典)
+            (API响应文本, usage统计字典)，命中缓存时usage为空字典
         """
+        request_kwargs = {
+            'model': model or self.model,
+            'messages': messages,
+            'temperature': temperature,
+            'max_tokens': 4000
+        }
+        if response_format and ENABLE_JSON_MODE:
+            request_kwargs['response_format'] = response_format
+        
+        cache_key = None
+        if ENABLE_LLM_CACHE:
+            cache_key = hashlib.sha256(
+                json_utils.dumps(request_kwargs).encode('utf-8')
+            ).hexdigest()
+            cached = await _run_db(db.get_llm_cache, cache_key)
+            if cached is not None:
+                return cached, {}
+        
         async with self.semaphore:
             try:
-                response = await self.client.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=4000
-                )
-                
-                # 提取文本内容
-                content = response.choices[0].message.content
+                # 超时只计算获得并发许可后的实际请求时间，排队等待不计入
+                if ENABLE_STREAMING:
+                    content, response_usage = await asyncio.wait_for(
+                        self._stream_completion(request_kwargs), timeout=PAPER_TIMEOUT
+                    )
+                else:
+                    response = await asyncio.wait_for(
+                        self.client.chat.completions.create(**request_kwargs), timeout=PAPER_TIMEOUT
+                    )
+                    # 提取文本内容
+                    content = response.choices[0].message.content
+                    response_usage = getattr(response, 'usage', None)
                 
                 # 提取Token使用统计
                 usage = {}
-                if hasattr(response, 'usage') and response.usage:
+                if response_usage:
                     usage = {
-                        'prompt_tokens': response.usage.prompt_tokens or 0,
-                        'completion_tokens': response.usage.completion_tokens or 0,
-                        'total_tokens': response.usage.total_tokens or 0
+                        'prompt_tokens': response_usage.prompt_tokens or 0,
+                        'completion_tokens': response_usage.completion_tokens or 0,
+                        'total_tokens': response_usage.total_tokens or 0
                     }
                     # 累加到总计
-                    self.token_stats['prompt_tokens'] += usage['prompt_tokens']
-                    self.token_stats['completion_tokens'] += usage['completion_tokens']
-                    self.token_stats['total_tokens'] += usage['total_tokens']
-                    self.token_stats['api_calls'] += 1
+                    stats = self.token_stats
+                    stats['prompt_tokens'] += usage['prompt_tokens']
+                    stats['completion_tokens'] += usage['completion_tokens']
+                    stats['total_tokens'] += usage['total_tokens']
+                    stats['api_calls'] += 1
+                
+                # 只缓存可解析的响应，避免解析失败重试时反复命中同一错误结果
+                if cache_key and content:
+                    try:
+                        _robust_parse_json(content)
+                        await _run_db(db.set_llm_cache, cache_key, content)
+                    except ValueError:
+                        pass
                 
                 return content, usage
             except Exception as e:
                 console.log(f"[red]API调用失败: {e}")
                 raise
     
+    async def _stream_completion(self, request_kwargs: Dict[str, Any]) -> tuple:
+        """
+        以流式方式请求补全，边接收边拼接文本
+        
+        Args:
+            request_kwargs: chat.completions.create 的请求参数
+        
+        Returns:
+            (完整响应文本, 末尾分块中的usage对象，服务端未返回时为None)
+        """
+        stream = await self.client.chat.completions.create(
+            **request_kwargs,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        
+        parts = []
+        usage = None
+        async for chunk in stream:
+            if chunk.choices:
+                delta = chunk.choices[0].delta
+                if delta and delta.content:
+                    parts.append(delta.content)
+            if getattr(chunk, 'usage', None):
+                usage = chunk.usage
+        
+        return ''.join(parts), usage
+    
     async def screen_abstract(self, title: str, abstract: str, research_topic: str) -> Dict[str, Any]:
         """
         摘要筛选 - 判断论文是否与主题相关
@@ -129,31 +486,20 @@ class PaperAnalyzer:
         Returns:
             筛选结果字典
         """
-        prompt = f"""你是一个学术论文筛选助手。请判断以下论文是否与主题"{research_topic}"相关。
-
-论文标题: {title}
-
-论文摘要: {abstract}
-
-请按以下JSON格式输出你的判断:
-{{
-    "relevance_score": 0-100的整数,  // 相关度分数，100表示完全相关
-    "is_relevant": true/false,  // 是否与主题相关（分数>60视为相关）
-    "reason": "简要说明判断理由（2-3句话）"
-}}
-
-注意：只输出JSON，不要输出其他内容。"""
-
-        messages = [
-            {"role": "system", "content": "你是一个专业的学术论文筛选助手，擅长判断论文与特定研究主题的相关性。"},
-            {"role": "user", "content": prompt}
-        ]
+        prompt = SCREEN_USER_TEMPLATE.format_map({
+            'topic': research_topic,
+            'title': title,
+            'abstract': abstract
+        })
+        messages = [_SYSTEM_MSG_SCREEN, {"role": "user", "content": prompt}]
         
         try:
-            response, _ = await self._call_api(messages, temperature=0.3)
+            response, _ = await self._call_api(
+                messages, temperature=0, response_format=JSON_RESPONSE_FORMAT, model=self.model_lite
+            )
             
             # 解析JSON响应
-            result = json.loads(response)
+            result = _robust_parse_json(response)
             return {
                 'relevance_score': float(result.get('relevance_score', 0)),
                 'is_relevant': result.get('is_relevant', False),
@@ -164,13 +510,81 @@ class PaperAnalyzer:
             return {
                 'relevance_score': 0,
                 'is_relevant': False,
-                'relevance_reason': f'解析失败: {str(e)}'
+                'relevance_reason': f'解析失败: {str(e)}',
+                'failed': True
             }
     
+    async def screen_abstracts_batch(
+        self,
+        items: List[Tuple[str, str, str]],
+        research_topic: str,
+        results: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        批量摘要筛选 - 一次API调用判断多篇论文的相关性
+        
+        Args:
+            items: (arxiv_id, 标题, 摘要) 列表
+            research_topic: 研究主题
+            results: 结果字典，每得到一篇的结果即原地写入（调用方超时取消时可保留已得到的结果）
+        
+        Returns:
+            arxiv_id -> 筛选结果字典；批量结果缺失的论文会逐篇重新筛选
+        """
+        papers_json = json_utils.dumps([
+            {"id": arxiv_id, "title": title, "abstract": abstract}
+            for arxiv_id, title, abstract in items
+        ])
+        
+        prompt = SCREEN_BATCH_USER_TEMPLATE.format_map({
+            'topic': research_topic,
+            'papers': papers_json
+        })
+        messages = [_SYSTEM_MSG_SCREEN_BATCH, {"role": "user", "content": prompt}]
+        
+        if results is None:
+            results = {}
+        try:
+            response, _ = await self._call_api(
+                messages, temperature=0, response_format=JSON_RESPONSE_FORMAT, model=self.model_lite
+            )
+            parsed = _robust_parse_json(response)
+            verdicts = parsed.get('results', []) if isinstance(parsed, dict) else parsed
+            
+            # 只接受本批次内的ID，模型臆造或改写的ID不写入结果（也就不会进入缓存）
+            requested_ids = {arxiv_id for arxiv_id, _, _ in items}
+            for verdict in verdicts:
+                if not isinstance(verdict, dict):
+                    continue
+                arxiv_id = str(verdict.get('id', ''))
+                if arxiv_id not in requested_ids:
+                    continue
+                # 逐条解析：单条结果格式错误只让该论文改为逐篇筛选
+                try:
+                    results[arxiv_id] = {
+                        'relevance_score': float(verdict.get('relevance_score', 0)),
+                        'is_relevant': verdict.get('is_relevant', False),
+                        'relevance_reason': verdict.get('reason', '')
+                    }
+                except (TypeError, ValueError) as e:
+                    console.log(f"[yellow]批量筛选结果格式错误 {arxiv_id}: {e}")
+        except Exception as e:
+            console.log(f"[red]批量摘要筛选解析失败，改为逐篇筛选: {e}")
+        
+        # 批量结果中缺失的论文逐篇筛选
+        async def screen_single(arxiv_id: str, title: str, abstract: str):
+            results[arxiv_id] = await self.screen_abstract(title, abstract, research_topic)
+        
+        missing = [item for item in items if item[0] not in results]
+        if missing:
+            await asyncio.gather(*[screen_single(*item) for item in missing])
+        
+        return results
+    
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=4, max=10),
-        retry=retry_if_exception_type((json.JSONDecodeError, Exception)),
+        retry=retry_if_exception_type((json_utils.JSONDecodeError, Exception)),
         before_sleep=lambda retry_state: console.log(f"[yellow]论文分析失败，{retry_state.next_action.sleep}秒后进行第{retry_state.attempt_number + 1}次重试..."),
         reraise=True
     )
@@ -186,54 +600,19 @@ class PaperAnalyzer:
         Returns:
             论文分析结果
         """
-        # 截断内容以适应上下文限制（保留前30000字符，约10-15页）
-        truncated_content = content[:30000] if len(content) > 30000 else content
-        
-        prompt = f"""你是一位专业的学术论文分析专家。请对以下论文进行深度分析，提取核心要素。
-
-研究主题: {research_topic}
-
-论文标题: {title}
-
-论文内容:
-{truncated_content}
-
-请按以下JSON格式输出分析结果:
-{{
-    "problem_definition": "该方法试图解决的具体问题（1-2句话）",
-    "mathematical_modeling": "关键公式、优化目标、约束条件（简要描述）",
-    "core_innovation": "核心创新点（不超过3个关键词或短语）",
-    "theoretical_guarantee": "是否有理论分析（如收敛性、复杂度），简要说明",
-    "experimental_design": "数据集、Baseline、评价指标",
-    "quantitative_results": "相对提升（如'+2.3%'）、效率改进等量化效果",
-    "limitations": "作者承认的局限性+你可以发现的可改进点",
-    "innovation_ideas": "基于该论文，你可以提出的创新思路（至少3个）",
-    "improvement_category": "改进方向分类，必须是以下之一: 数学改进、结构改进、自适应方法、理论分析、应用扩展、效率优化、其他"
-}}
-
-注意：
-1. 只输出JSON格式，不要输出其他内容
-2. 如果某部分信息在论文中未明确提及，填写"未明确提及"
-3. improvement_category必须从给定列表中选择"""
-
-        messages = [
-            {"role": "system", "content": "你是一位专业的学术论文分析专家，擅长提取论文的核心要素和创新点。"},
-            {"role": "user", "content": prompt}
-        ]
+        # 截断内容以适应上下文限制（按Token预算保留前部内容）
+        truncated_content = self._truncate_content(content)
         
-        response, _ = await self._call_api(messages, temperature=0.3)
+        prompt = ANALYSIS_USER_TEMPLATE.format_map({
+            'topic': research_topic,
+            'title': title,
+            'content': truncated_content
+        })
+        messages = [_SYSTEM_MSG_ANALYSIS, {"role": "user", "content": prompt}]
         
-        # 清理响应，提取JSON部分
-        response = response.strip()
-        if response.startswith('```json'):
-            response = response[7:]
-        if response.startswith('```'):
-            response = response[3:]
-        if response.endswith('```'):
-            response = response[:-3]
-        response = response.strip()
+        response, _ = await self._call_api(messages, temperature=0, response_format=JSON_RESPONSE_FORMAT)
         
-        result = json.loads(response)
+        result = _robust_parse_json(response)
         
         # 验证改进方向分类
         category = result.get('improvement_category', '其他')
@@ -260,48 +639,197 @@ class PaperAnalyzer:
             relevance_reason=''
         )
     
-    async def process_abstract_screening(self, papers: List[Dict[str, Any]], research_topic: str):
+    async def process_abstract_screening(
+        self,
+        papers: List[Dict[str, Any]],
+        research_topic: str,
+        keywords: Optional[List[str]] = None
+    ):
         """
         批量处理摘要筛选
         
         Args:
             papers: 论文列表
             research_topic: 研究主题
+            keywords: 检索关键词；开启预筛选时，标题和摘要均未命中任何关键词的论文直接判为不相关，不调用模型
         """
         console.log(f"[blue]开始对 {len(papers)} 篇论文进行摘要筛选...")
         
-        async def process_one(paper):
-            arxiv_id = paper['arxiv_id']
-            
+        # 预绑定循环内频繁访问的属性
+        update_bulk = db.update_papers_bulk
+        screen_batch = self.screen_abstracts_batch
+        log = console.log
+        
+        # 同一主题下已筛选过的论文直接复用缓存结果
+        topic_hash = hashlib.sha256(research_topic.encode('utf-8')).hexdigest()
+        cached = {}
+        if ENABLE_LLM_CACHE:
+            cached = await _run_db(
+                db.get_screening_cache, topic_hash, [paper['arxiv_id'] for paper in papers]
+            )
+            if cached:
+                log(f"[blue]{len(cached)} 篇论文命中筛选缓存")
+        
+        def build_rows(batch, results):
+            rows = []
+            for paper in batch:
+                arxiv_id = paper['arxiv_id']
+                result = results[arxiv_id]
+                
+                # 更新数据库
+                updates = {
+                    'relevance_score': result['relevance_score'],
+                    'relevance_reason': result['relevance_reason'],
+                    'research_topic': research_topic
+                }
+                
+                if result['is_relevant']:
+                    updates['status'] = 'relevant'
+                    log(f"[green]✓ 相关: {paper['title'][:50]}... (分数: {result['relevance_score']})")
+                else:
+                    updates['status'] = 'irrelevant'
+                    log(f"[yellow]✗ 不相关: {paper['title'][:50]}... (分数: {result['relevance_score']})")
+                
+                rows.append((arxiv_id, updates))
+            return rows
+        
+        async def save_results(batch, results):
+            # 整批结果一次写入数据库，成功的筛选结果同时写入缓存
+            await _run_db(update_bulk, build_rows(batch, results))
+            if ENABLE_LLM_CACHE:
+                await _run_db(db.set_screening_cache_bulk, topic_hash, {
+                    arxiv_id: result for arxiv_id, result in results.items() if not result.get('failed')
+                })
+        
+        async def process_batch(job):
+            batch, results = job
             # 更新状态
-            db.update_paper(arxiv_id, {'status': 'abstract_screening'})
+            await _run_db(update_bulk, [
+                (paper['arxiv_id'], {'status': 'abstract_screening'}) for paper in batch
+            ])
+            
+            # 进行批量筛选（结果逐篇写入results，超时后仍可保留）
+            await screen_batch(
+                [(paper['arxiv_id'], paper['title'], paper['abstract']) for paper in batch],
+                research_topic,
+                results
+            )
+            await save_results(batch, results)
+        
+        cached_papers = [paper for paper in papers if paper['arxiv_id'] in cached]
+        await _run_db(update_bulk, build_rows(cached_papers, cached))
+        pending = [paper for paper in papers if paper['arxiv_id'] not in cached]
+        
+        # 关键词预筛选（需显式开启）：标题和摘要都不含任何检索关键词的论文直接判为不相关，不调用模型
+        pattern = _keyword_pattern(keywords) if ENABLE_KEYWORD_PREFILTER else None
+        if pattern is not None:
+            matched = []
+            prefiltered = {}
+            for paper in pending:
+                if pattern.search(paper['title'] or '') or pattern.search(paper['abstract'] or ''):
+                    matched.append(paper)
+                else:
+                    prefiltered[paper['arxiv_id']] = {
+                        'relevance_score': 0,
+                        'is_relevant': False,
+                        'relevance_reason': '标题和摘要未包含任何检索关键词（预筛选）'
+                    }
+            if prefiltered:
+                log(f"[blue]{len(prefiltered)} 篇论文未命中检索关键词，跳过模型筛选")
+                await _run_db(update_bulk, build_rows(
+                    [paper for paper in pending if paper['arxiv_id'] in prefiltered], prefiltered
+                ))
+            pending = matched
+        
+        # 其余论文按批并发处理
+        jobs = [
+            (pending[i:i + SCREENING_BATCH_SIZE], {})
+            for i in range(0, len(pending), SCREENING_BATCH_SIZE)
+        ]
+        outcomes = await self._run_bounded(process_batch, jobs)
+        
+        # 失败或超时的批次：已得到结果的论文照常保存，其余恢复为待筛选状态，便于下次重新筛选
+        failed_rows = []
+        for (batch, results), outcome in zip(jobs, outcomes):
+            if isinstance(outcome, BaseException):
+                error = '超时' if isinstance(outcome, asyncio.TimeoutError) else outcome
+                done = [
+                    paper for paper in batch
+                    if paper['arxiv_id'] in results and not results[paper['arxiv_id']].get('failed')
+                ]
+                log(f"[red]摘要筛选失败（{len(batch) - len(done)}/{len(batch)}篇未完成）: {error}")
+                done_ids = {paper['arxiv_id'] for paper in done}
+                if done:
+                    await save_results(done, {arxiv_id: results[arxiv_id] for arxiv_id in done_ids})
+                failed_rows.extend(
+                    (paper['arxiv_id'], {'status': 'discovered'})
+                    for paper in batch if paper['arxiv_id'] not in done_ids
+                )
+        await _run_db(update_bulk, failed_rows)
+        console.log("[green]摘要筛选完成")
+    
+    async def _analyze_one(self, paper: Dict[str, Any], research_topic: str, update):
+        """
+        深度分析单篇论文并通过 update 写回结果（异常在内部处理，超时由调用方控制）
+        
+        Args:
+            paper: 论文（需包含 arxiv_id、title、pdf_path）
+            research_topic: 研究主题
+            update: 状态更新函数 update(arxiv_id, updates)
+        """
+        arxiv_id = paper['arxiv_id']
+        log = console.log
+        
+        # 更新状态
+        await _run_db(update, arxiv_id, {'status': 'analyzing'})
+        
+        try:
+            # 获取PDF路径
+            pdf_path = paper.get('pdf_path')
+            if not pdf_path:
+                log(f"[red]PDF路径不存在: {arxiv_id}")
+                await _run_db(update, arxiv_id, {'status': 'analysis_failed'})
+                return
+            
+            # 提取文本（CPU密集，放到线程中执行，避免阻塞并发的下载和API调用）
+            content = await asyncio.to_thread(get_pdf_handler().extract_text, pdf_path)
+            if not content:
+                log(f"[red]PDF文本提取失败: {arxiv_id}")
+                await _run_db(update, arxiv_id, {'status': 'analysis_failed'})
+                return
             
-            # 进行筛选
-            result = await self.screen_abstract(
+            # 进行深度分析
+            analysis = await self.analyze_full_paper(
                 paper['title'],
-                paper['abstract'],
+                content,
                 research_topic
             )
             
             # 更新数据库
-            updates = {
-                'relevance_score': result['relevance_score'],
-                'relevance_reason': result['relevance_reason'],
-                'research_topic': research_topic
-            }
+            await _run_db(update, arxiv_id, {
+                'status': 'analyzed',
+                'problem_definition': analysis.problem_definition,
+                'mathematical_modeling': analysis.mathematical_modeling,
+                'core_innovation': analysis.core_innovation,
+                'theoretical_guarantee': analysis.theoretical_guarantee,
+                'experimental_design': analysis.experimental_design,
+                'quantitative_results': analysis.quantitative_results,
+                'limitations': analysis.limitations,
+                'innovation_ideas': analysis.innovation_ideas,
+                'improvement_category': analysis.improvement_category
+            })
             
-            if result['is_relevant']:
-                updates['status'] = 'relevant'
-                console.log(f"[green]✓ 相关: {paper['title'][:50]}... (分数: {result['relevance_score']})")
-            else:
-                updates['status'] = 'irrelevant'
-                console.log(f"[yellow]✗ 不相关: {paper['title'][:50]}... (分数: {result['relevance_score']})")
+            log(f"[green]✓ 分析完成: {paper['title'][:50]}...")
             
-            db.update_paper(arxiv_id, updates)
-        
-        # 并发处理
-        await asyncio.gather(*[process_one(paper) for paper in papers])
-        console.log("[green]摘要筛选完成")
+        except Exception as e:
+            # 提取原始错误信息（如果是RetryError）
+            original_error = e
+            if isinstance(e, RetryError):
+                # 获取最后一次重试的原始异常
+                if e.last_attempt.failed:
+                    original_error = e.last_attempt.exception()
+            log(f"[red]分析失败 {arxiv_id}: {original_error}")
+            await _run_db(update, arxiv_id, {'status': 'analysis_failed'})
     
     async def process_full_analysis(self, papers: List[Dict[str, Any]], research_topic: str):
         """
@@ -312,75 +840,66 @@ class PaperAnalyzer:
             research_topic: 研究主题
         """
         console.log(f"[blue]开始对 {len(papers)} 篇论文进行深度分析...")
-        pdf_handler = PDFHandler()
+        
+        # 预绑定循环内频繁访问的属性
+        # 分析结果（成本最高的产出）逐篇立即落库，中途崩溃或中断不丢失已付费的结果
+        update = db.update_paper
+        analyze_one = self._analyze_one
+        log = console.log
         
         async def process_one(paper):
-            arxiv_id = paper['arxiv_id']
-            
-            # 更新状态
-            db.update_paper(arxiv_id, {'status': 'analyzing'})
-            
-            try:
-                # 获取PDF路径
-                pdf_path = paper.get('pdf_path')
-                if not pdf_path:
-                    console.log(f"[red]PDF路径不存在: {arxiv_id}")
-                    db.update_paper(arxiv_id, {'status': 'analysis_failed'})
-                    return
-                
-                # 提取文本
-                content = pdf_handler.extract_text(pdf_path)
-                if not content:
-                    console.log(f"[red]PDF文本提取失败: {arxiv_id}")
-                    db.update_paper(arxiv_id, {'status': 'analysis_failed'})
-                    return
-                
-                # 进行深度分析
-                analysis = await self.analyze_full_paper(
-                    paper['title'],
-                    content,
-                    research_topic
-                )
-                
-                # 更新数据库
-                db.update_paper(arxiv_id, {
-                    'status': 'analyzed',
-                    'problem_definition': analysis.problem_definition,
-                    'mathematical_modeling': analysis.mathematical_modeling,
-                    'core_innovation': analysis.core_innovation,
-                    'theoretical_guarantee': analysis.theoretical_guarantee,
-                    'experimental_design': analysis.experimental_design,
-                    'quantitative_results': analysis.quantitative_results,
-                    'limitations': analysis.limitations,
-                    'innovation_ideas': analysis.innovation_ideas,
-                    'improvement_category': analysis.improvement_category,
-                    'analysis_result': json.dumps({
-                        'problem_definition': analysis.problem_definition,
-                        'mathematical_modeling': analysis.mathematical_modeling,
-                        'core_innovation': analysis.core_innovation,
-                        'theoretical_guarantee': analysis.theoretical_guarantee,
-                        'experimental_design': analysis.experimental_design,
-                        'quantitative_results': analysis.quantitative_results,
-                        'limitations': analysis.limitations,
-                        'innovation_ideas': analysis.innovation_ideas,
-                        'improvement_category': analysis.improvement_category
-                    }, ensure_ascii=False)
-                })
-                
-                console.log(f"[green]✓ 分析完成: {paper['title'][:50]}...")
-                
-            except Exception as e:
-                # 提取原始错误信息（如果是RetryError）
-                original_error = e
-                if isinstance(e, RetryError):
-                    # 获取最后一次重试的原始异常
-                    if e.last_attempt.failed:
-                        original_error = e.last_attempt.exception()
-                console.log(f"[red]分析失败 {arxiv_id}: {original_error}")
-                db.update_paper(arxiv_id, {'status': 'analysis_failed'})
+            await analyze_one(paper, research_topic, update)
         
         # 并发处理
-        await asyncio.gather(*[process_one(paper) for paper in papers])
+        results = await self._run_bounded(process_one, papers)
+        for paper, result in zip(papers, results):
+            if isinstance(result, BaseException):
+                error = '超时' if isinstance(result, asyncio.TimeoutError) else result
+                log(f"[red]分析失败 {paper['arxiv_id']}: {error}")
+                await _run_db(update, paper['arxiv_id'], {'status': 'analysis_failed'})
+        console.log("[green]深度分析完成")
+    
+    async def process_full_analysis_queue(
+        self,
+        queue: asyncio.Queue,
+        research_topic: str,
+        workers: int = ANALYSIS_WORKERS
+    ):
+        """
+        从队列中持续取出论文进行深度分析（与PDF下载流水线配合）
+        
+        队列中放入 None 表示没有更多论文。
+        
+        Args:
+            queue: 待分析论文队列
+            research_topic: 研究主题
+            workers: 并发分析的论文数
+        """
+        console.log(f"[blue]深度分析已启动（{workers} 路并发），PDF下载完成即进入分析...")
+        # 分析结果逐篇立即落库，中途崩溃或中断不丢失已付费的结果
+        update = db.update_paper
+        analyze_one = self._analyze_one
+        log = console.log
+        
+        async def worker():
+            while True:
+                paper = await queue.get()
+                if paper is None:
+                    # 把结束标记留给其他worker
+                    queue.put_nowait(None)
+                    return
+                try:
+                    await analyze_one(paper, research_topic, update)
+                except Exception as e:
+                    # 单篇失败（超时、写库出错等）只标记该论文，worker继续处理队列中的其余论文
+                    error = '超时' if isinstance(e, asyncio.TimeoutError) else e
+                    log(f"[red]分析失败 {paper['arxiv_id']}: {error}")
+                    try:
+                        await _run_db(update, paper['arxiv_id'], {'status': 'analysis_failed'})
+                    except Exception as db_error:
+                        log(f"[red]分析失败状态写入失败 {paper['arxiv_id']}: {db_error}")
+        
+        await asyncio.gather(*[worker() for _ in range(workers)])
         console.log("[green]深度分析完成")
 
 
@@ -394,52 +913,19 @@ class PaperAnalyzer:
         Returns:
             英文关键词列表
         """
-        prompt = f"""你是一位专业的学术论文检索专家。请根据以下研究主题，生成适合在arXiv上检索的英文关键词。
-
-研究主题: "{research_topic}"
-
-要求：
-1. 生成英文关键词或短语
-2. 关键词应该覆盖主题的核心概念
-3. 考虑使用同义词或相关术语
-4. 优先使用学术界常用的术语
-5. 如果主题是中文，请准确翻译为英文学术术语
-6. 覆盖与核心概念强关联的同领域技术 / 方法术语
-7. 包含核心方法 / 技术的变体、改进型、衍生型术语
-8. 涵盖支撑核心概念的底层理论 / 数学基础术语
-9. 补充 arXiv 对应学科的领域通用术语
-10. 包含核心技术的关键参数 / 核心模块术语
-
-
-请按以下JSON格式输出：
-{{
-    "keywords": ["keyword1", "keyword2", "keyword3"]
-}}
-
-注意：
-- 只输出JSON格式
-- 关键词必须是英文
-- 不要包含解释性文字"""
-
-        messages = [
-            {"role": "system", "content": "你是一位专业的学术论文检索专家，擅长将研究主题转化为有效的检索关键词。"},
-            {"role": "user", "content": prompt}
-        ]
+        # 同一进程内同一主题只生成一次（磁盘层由LLM响应缓存覆盖）
+        if research_topic in _KEYWORDS_CACHE:
+            return list(_KEYWORDS_CACHE[research_topic])
+        
+        prompt = KEYWORDS_USER_TEMPLATE.format_map({'topic': research_topic})
+        messages = [_SYSTEM_MSG_KEYWORDS, {"role": "user", "content": prompt}]
         
         try:
-            response, _ = await self._call_api(messages, temperature=0.3)
-            
-            # 清理响应
-            response = response.strip()
-            if response.startswith('```json'):
-                response = response[7:]
-            if response.startswith('```'):
-                response = response[3:]
-            if response.endswith('```'):
-                response = response[:-3]
-            response = response.strip()
+            response, _ = await self._call_api(
+                messages, temperature=0, response_format=JSON_RESPONSE_FORMAT, model=self.model_lite
+            )
             
-            result = json.loads(response)
+            result = _robust_parse_json(response)
             keywords = result.get('keywords', [])
             
             # 确保返回的是列表
@@ -450,6 +936,7 @@ class PaperAnalyzer:
             keywords = [k.strip() for k in keywords if k and k.strip()]
             
             console.log(f"[green]生成检索关键词: {', '.join(keywords)}")
+            _KEYWORDS_CACHE[research_topic] = tuple(keywords)
             return keywords
             
         except Exception as e:
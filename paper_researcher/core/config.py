@@ -15,6 +15,8 @@ PROJECT_ROOT = Path(__file__).parent.parent.absolute()
 DOUBAO_API_KEY = os.getenv("DOUBAO_API_KEY", "")
 DOUBAO_BASE_URL = os.getenv("DOUBAO_BASE_URL", "https://ark.cn-beijing.volces.com/api/v3")
 DOUBAO_MODEL_NAME = os.getenv("DOUBAO_MODEL_NAME", "doubao-1.5-pro-32k-250115")
+# 轻量模型：用于关键词生成、摘要筛选等简单任务，默认与主模型相同
+DOUBAO_MODEL_NAME_LITE = os.getenv("DOUBAO_MODEL_NAME_LITE", DOUBAO_MODEL_NAME)
 
 # 检索配置 - 漏斗式过滤
 MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "20"))
@@ -25,9 +27,38 @@ MAX_PAPERS_PER_SEARCH = int(os.getenv("MAX_PAPERS_PER_SEARCH", "100"))
 # 第二层：精读上限（只分析最相关的N篇）
 MAX_PAPERS_FOR_ANALYSIS = int(os.getenv("MAX_PAPERS_FOR_ANALYSIS", "20"))
 
+# 下载与分析流水线中同时进行深度分析的论文数
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "4"))
+
+# PDF并发下载数（所有下载共享同一HTTP会话）
+PDF_MAX_CONCURRENT_DOWNLOADS = int(os.getenv("PDF_MAX_CONCURRENT_DOWNLOADS", "8"))
+
+# 单次API请求超时时间（秒），从获得并发许可后开始计时，超时按API失败重试
+PAPER_TIMEOUT = float(os.getenv("PAPER_TIMEOUT", "180"))
+
+# 摘要筛选批大小（每次API调用合并筛选的论文数）
+SCREENING_BATCH_SIZE = int(os.getenv("SCREENING_BATCH_SIZE", "10"))
+
+# 深度分析时论文全文的Token预算
+ANALYSIS_TOKEN_BUDGET = int(os.getenv("ANALYSIS_TOKEN_BUDGET", "8000"))
+# 未安装tiktoken时按字符数截断论文全文的上限
+ANALYSIS_MAX_CHARS = int(os.getenv("ANALYSIS_MAX_CHARS", "30000"))
+
 # 相关度分数阈值（可选，低于此分数不进入精读）
 RELEVANCE_SCORE_THRESHOLD = float(os.getenv("RELEVANCE_SCORE_THRESHOLD", "60"))
 
+# 关键词预筛选（默认关闭）：标题和摘要均未命中任何检索关键词中单词的论文直接判为不相关，不调用模型
+ENABLE_KEYWORD_PREFILTER = os.getenv("ENABLE_KEYWORD_PREFILTER", "false").lower() in ("1", "true", "yes")
+
+# LLM响应缓存（相同模型+相同提示词直接复用已有响应）
+ENABLE_LLM_CACHE = os.getenv("ENABLE_LLM_CACHE", "true").lower() in ("1", "true", "yes")
+
+# 流式接收LLM响应
+ENABLE_STREAMING = os.getenv("ENABLE_STREAMING", "true").lower() in ("1", "true", "yes")
+
+# JSON结构化输出模式（模型不支持response_format时可关闭）
+ENABLE_JSON_MODE = os.getenv("ENABLE_JSON_MODE", "true").lower() in ("1", "true", "yes")
+
 # 数据存储路径
 DATABASE_PATH = PROJECT_ROOT / os.getenv("DATABASE_PATH", "data/papers.db")
 PDF_DOWNLOAD_PATH = PROJECT_ROOT / os.getenv("PDF_DOWNLOAD_PATH", "papers_output/pdfs")
@@ -51,6 +82,20 @@ class PaperStatus:
     ANALYZED = "analyzed"              # 分析完成
     ANALYSIS_FAILED = "analysis_failed"  # 分析失败
 
+# 论文状态显示名称
+STATUS_NAMES = {
+    PaperStatus.DISCOVERED: '已发现',
+    PaperStatus.ABSTRACT_SCREENING: '摘要筛选中',
+    PaperStatus.RELEVANT: '相关（待下载）',
+    PaperStatus.IRRELEVANT: '不相关',
+    PaperStatus.PDF_DOWNLOADING: 'PDF下载中',
+    PaperStatus.PDF_DOWNLOADED: 'PDF已下载',
+    PaperStatus.PDF_FAILED: 'PDF下载失败',
+    PaperStatus.ANALYZING: '深度分析中',
+    PaperStatus.ANALYZED: '分析完成',
+    PaperStatus.ANALYSIS_FAILED: '分析失败'
+}
+
 # 改进方向分类
 IMPROVEMENT_CATEGORIES = [
     "数学改进",
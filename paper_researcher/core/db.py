@@ -2,11 +2,41 @@
 数据库模型和操作
 """
 import sqlite3
-import json
+import threading
+from itertools import groupby
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from contextlib import contextmanager
 from core.config import DATABASE_PATH, PaperStatus
+from utils import json_utils
+
+
+# 检索入库时写入的论文字段（其余字段由后续流程更新）
+_PAPER_COLUMNS = (
+    'arxiv_id',
+    'title',
+    'authors',
+    'abstract',
+    'published_date',
+    'arxiv_url',
+    'pdf_url',
+    'status',
+    'search_session_id',
+)
+
+# 固定列的INSERT语句，便于sqlite3复用已编译的语句
+_INSERT_PAPER_SQL = (
+    f"INSERT OR IGNORE INTO papers ({', '.join(_PAPER_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(_PAPER_COLUMNS))})"
+)
+
+
+def _paper_row(paper_data: Dict[str, Any]) -> tuple:
+    """将论文字典转换为与 _PAPER_COLUMNS 对齐的参数元组"""
+    row = [paper_data.get(c) for c in _PAPER_COLUMNS]
+    if row[_PAPER_COLUMNS.index('status')] is None:
+        row[_PAPER_COLUMNS.index('status')] = PaperStatus.DISCOVERED
+    return tuple(row)
 
 
 class Database:
@@ -14,21 +44,45 @@ class Database:
     
     def __init__(self, db_path: str = None):
         self.db_path = str(db_path or DATABASE_PATH)
+        # 复用单个长连接，事务由 _get_connection 显式管理
+        self._conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            isolation_level=None
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        
+        # WAL模式减少写放大，并允许读写并发
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        self._conn.execute("PRAGMA mmap_size=268435456")
+        # 其他进程（如并行运行的另一个会话）持有写锁时等待而非立即报错
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        
         self._init_db()
+        self._paper_columns = {
+            row['name'] for row in self._conn.execute("PRAGMA table_info(papers)")
+        }
     
     @contextmanager
     def _get_connection(self):
-        """获取数据库连接上下文管理器"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        try:
-            yield conn
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+        """获取数据库连接上下文管理器（同一时间只有一个事务使用共享连接）"""
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception as e:
+                conn.execute("ROLLBACK")
+                raise e
+    
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
     
     def _init_db(self):
         """初始化数据库表结构"""
@@ -57,7 +111,7 @@ class Database:
                     -- 分类
                     improvement_category TEXT,
 
-                    -- 深度分析结果（JSON格式存储）
+                    -- 深度分析结果（JSON格式，已弃用：各要素直接存于下列字段）
                     analysis_result TEXT,
 
                     -- 核心要素
@@ -101,6 +155,26 @@ class Database:
                 )
             """)
             
+            # LLM响应缓存表
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # 摘要筛选结果缓存表（同一主题下同一论文只筛选一次）
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS screening_cache (
+                    topic_hash TEXT NOT NULL,
+                    arxiv_id TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (topic_hash, arxiv_id)
+                )
+            """)
+            
             # 创建索引
             cursor.execute("""
                 CREATE INDEX IF NOT EXISTS idx_papers_status ON papers(status)
@@ -114,8 +188,16 @@ class Database:
             cursor.execute("""
                 CREATE INDEX IF NOT EXISTS idx_papers_topic ON papers(research_topic)
             """)
-
-            conn.commit()
+            # 复合索引：覆盖按会话/主题 + 状态过滤的常用查询
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_papers_status_session ON papers(search_session_id, status)
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_papers_topic_status ON papers(research_topic, status)
+            """)
+            
+            # 更新统计信息，便于查询规划器选择复合索引
+            cursor.execute("ANALYZE")
     
     # ==================== 论文操作 ====================
     
@@ -140,26 +222,53 @@ class Database:
                 )
             return cursor.fetchone() is not None
     
-    def add_paper(self, paper_data: Dict[str, Any]) -> int:
-        """添加新论文"""
+    def get_all_arxiv_ids(self, session_id: int = None) -> frozenset:
+        """获取已存在的全部arXiv ID
+        
+        Args:
+            session_id: 检索会话ID，如果指定则只返回该主题下的论文
+        """
         with self._get_connection() as conn:
             cursor = conn.cursor()
+            if session_id:
+                cursor.execute(
+                    "SELECT arxiv_id FROM papers WHERE search_session_id = ?",
+                    (session_id,)
+                )
+            else:
+                cursor.execute("SELECT arxiv_id FROM papers")
+            return frozenset(row['arxiv_id'] for row in cursor.fetchall())
+    
+    def add_paper(self, paper_data: Dict[str, Any]) -> Optional[int]:
+        """添加新论文（只写入 _PAPER_COLUMNS 中的字段）
+        
+        Returns:
+            新论文的行ID，论文在该会话下已存在时返回None
+        """
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(_INSERT_PAPER_SQL, _paper_row(paper_data))
+            return cursor.lastrowid if cursor.rowcount else None
+    
+    def add_papers_bulk(self, papers: List[Dict[str, Any]]) -> List[Optional[int]]:
+        """批量添加论文（单个事务），已存在的论文会被忽略
+        
+        Returns:
+            与papers一一对应的行ID列表；有论文被忽略时无法对应行ID，全部为None
+        """
+        if not papers:
+            return []
+        
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(_INSERT_PAPER_SQL, [_paper_row(p) for p in papers])
+            inserted = cursor.rowcount
+            if inserted != len(papers):
+                return [None] * len(papers)
             
-            fields = []
-            values = []
-            for key, value in paper_data.items():
-                fields.append(key)
-                values.append(value)
-            
-            placeholders = ', '.join(['?' for _ in values])
-            fields_str = ', '.join(fields)
-            
-            cursor.execute(
-                f"INSERT INTO papers ({fields_str}) VALUES ({placeholders})",
-                values
-            )
-            
-            return cursor.lastrowid
+            # 同一写事务内AUTOINCREMENT分配的ID连续，可由最后一个ID反推
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            return list(range(last_id - inserted + 1, last_id + 1))
     
     def update_paper(self, arxiv_id: str, updates: Dict[str, Any]):
         """更新论文信息"""
@@ -176,6 +285,31 @@ class Database:
                 values
             )
     
+    def update_papers_bulk(self, rows: List[Tuple[str, Dict[str, Any]]]):
+        """批量更新论文信息（单个事务）
+        
+        Args:
+            rows: (arxiv_id, 更新字段字典) 列表，相邻且字段相同的行合并为一次executemany
+        """
+        if not rows:
+            return
+        
+        now = datetime.now().isoformat()
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            
+            # 只合并相邻行，保证同一论文的多次更新按原顺序执行
+            for keys, group in groupby(rows, key=lambda row: tuple(row[1].keys())):
+                set_clause = ', '.join([f"{k} = ?" for k in keys] + ["updated_at = ?"])
+                values = [
+                    [updates[k] for k in keys] + [now, arxiv_id]
+                    for arxiv_id, updates in group
+                ]
+                cursor.executemany(
+                    f"UPDATE papers SET {set_clause} WHERE arxiv_id = ?",
+                    values
+                )
+    
     def get_paper_by_arxiv_id(self, arxiv_id: str) -> Optional[Dict[str, Any]]:
         """通过arXiv ID获取论文"""
         with self._get_connection() as conn:
@@ -187,6 +321,27 @@ class Database:
             row = cursor.fetchone()
             return dict(row) if row else None
     
+    def get_pdf_path(self, arxiv_id: str) -> Optional[str]:
+        """获取论文已下载的PDF路径（同一论文可能属于多个会话，取任一已记录的路径）"""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT pdf_path FROM papers WHERE arxiv_id = ? AND pdf_path IS NOT NULL LIMIT 1",
+                (arxiv_id,)
+            )
+            row = cursor.fetchone()
+            return row[0] if row else None
+    
+    @staticmethod
+    def _status_filter(status: str, session_id: int = None, research_topic: str = None) -> Tuple[str, tuple]:
+        """构建按状态查询的WHERE子句和参数"""
+        if research_topic:
+            # 按研究主题查询（跨会话）
+            return "status = ? AND research_topic = ?", (status, research_topic)
+        if session_id:
+            return "status = ? AND search_session_id = ?", (status, session_id)
+        return "status = ?", (status,)
+    
     def get_papers_by_status(self, status: str, session_id: int = None, research_topic: str = None) -> List[Dict[str, Any]]:
         """获取指定状态的论文
         
@@ -195,28 +350,91 @@ class Database:
             session_id: 检索会话ID（可选）
             research_topic: 研究主题（可选），用于跨会话获取相同主题的论文
         """
+        where, params = self._status_filter(status, session_id, research_topic)
         with self._get_connection() as conn:
             cursor = conn.cursor()
-            
-            if research_topic:
-                # 按研究主题查询（跨会话）
-                cursor.execute(
-                    "SELECT * FROM papers WHERE status = ? AND research_topic = ?",
-                    (status, research_topic)
-                )
-            elif session_id:
-                cursor.execute(
-                    "SELECT * FROM papers WHERE status = ? AND search_session_id = ?",
-                    (status, session_id)
-                )
-            else:
-                cursor.execute(
-                    "SELECT * FROM papers WHERE status = ?",
-                    (status,)
-                )
-            
+            cursor.execute(f"SELECT * FROM papers WHERE {where}", params)
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def count_papers_by_status(self, status: str, session_id: int = None, research_topic: str = None) -> int:
+        """统计指定状态的论文数量（不构造行对象）"""
+        where, params = self._status_filter(status, session_id, research_topic)
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT COUNT(*) FROM papers WHERE {where}", params)
+            return cursor.fetchone()[0]
+    
+    def get_papers_by_status_cols(
+        self,
+        status: str,
+        cols: Tuple[str, ...],
+        session_id: int = None,
+        research_topic: str = None
+    ) -> List[Dict[str, Any]]:
+        """获取指定状态的论文，只读取需要的列
+        
+        Args:
+            status: 论文状态
+            cols: 需要读取的列名
+            session_id: 检索会话ID（可选）
+            research_topic: 研究主题（可选）
+        """
+        unknown = set(cols) - self._paper_columns
+        if unknown:
+            raise ValueError(f"未知的论文字段: {', '.join(sorted(unknown))}")
+        
+        where, params = self._status_filter(status, session_id, research_topic)
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT {', '.join(cols)} FROM papers WHERE {where}", params)
             return [dict(row) for row in cursor.fetchall()]
     
+    def count_relevant(self, research_topic: str, threshold: float) -> Tuple[int, int]:
+        """统计主题下相关论文数，返回 (相关总数, 达到阈值的数量)"""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """SELECT COUNT(*) AS total, COALESCE(SUM(relevance_score >= ?), 0) AS passed
+                   FROM papers WHERE status = 'relevant' AND research_topic = ?""",
+                (threshold, research_topic)
+            )
+            row = cursor.fetchone()
+            return row['total'], row['passed']
+    
+    def get_top_relevant(self, research_topic: str, threshold: float, limit: int) -> List[Dict[str, Any]]:
+        """获取主题下达到阈值、按相关度排名前limit的相关论文"""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """SELECT * FROM papers
+                   WHERE status = 'relevant' AND research_topic = ? AND relevance_score >= ?
+                   ORDER BY relevance_score DESC, id
+                   LIMIT ?""",
+                (research_topic, threshold, limit)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def exclude_relevant_beyond(self, research_topic: str, threshold: float, limit: int, reason_suffix: str) -> int:
+        """将达到阈值但排名在前limit之外的相关论文一次性标记为不相关，返回更新行数"""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """UPDATE papers
+                   SET status = 'irrelevant',
+                       relevance_reason = COALESCE(relevance_reason, '') || ?,
+                       updated_at = ?
+                   WHERE status = 'relevant' AND research_topic = ? AND relevance_score >= ?
+                     AND id NOT IN (
+                         SELECT id FROM papers
+                         WHERE status = 'relevant' AND research_topic = ? AND relevance_score >= ?
+                         ORDER BY relevance_score DESC, id
+                         LIMIT ?
+                     )""",
+                (reason_suffix, datetime.now().isoformat(),
+                 research_topic, threshold, research_topic, threshold, limit)
+            )
+            return cursor.rowcount
+    
     def get_all_analyzed_papers(self, session_id: int = None) -> List[Dict[str, Any]]:
         """获取所有已分析的论文"""
         with self._get_connection() as conn:
@@ -246,7 +464,7 @@ class Database:
             cursor = conn.cursor()
             cursor.execute(
                 "INSERT INTO search_sessions (research_topic, keywords) VALUES (?, ?)",
-                (research_topic, json.dumps(keywords, ensure_ascii=False))
+                (research_topic, json_utils.dumps(keywords))
             )
             return cursor.lastrowid
     
@@ -318,10 +536,68 @@ class Database:
             row = cursor.fetchone()
             if row:
                 result = dict(row)
-                result['keywords'] = json.loads(result['keywords'])
+                result['keywords'] = json_utils.loads(result['keywords'])
                 return result
             return None
     
+    # ==================== LLM缓存操作 ====================
+    
+    def get_llm_cache(self, key: str) -> Optional[str]:
+        """获取缓存的LLM响应"""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT response FROM llm_cache WHERE key = ?",
+                (key,)
+            )
+            row = cursor.fetchone()
+            return row['response'] if row else None
+    
+    def set_llm_cache(self, key: str, response: str):
+        """写入LLM响应缓存"""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, created_at) VALUES (?, ?, ?)",
+                (key, response, datetime.now().isoformat())
+            )
+    
+    def get_screening_cache(self, topic_hash: str, arxiv_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量获取缓存的摘要筛选结果，返回 arxiv_id -> 筛选结果"""
+        cached = {}
+        if not arxiv_ids:
+            return cached
+        
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            # 分块查询，避免超出SQLite的参数个数上限
+            for i in range(0, len(arxiv_ids), 500):
+                chunk = arxiv_ids[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(
+                    f"SELECT arxiv_id, result FROM screening_cache WHERE topic_hash = ? AND arxiv_id IN ({placeholders})",
+                    (topic_hash, *chunk)
+                )
+                cached.update(
+                    (row['arxiv_id'], json_utils.loads(row['result'])) for row in cursor.fetchall()
+                )
+        return cached
+    
+    def set_screening_cache_bulk(self, topic_hash: str, results: Dict[str, Dict[str, Any]]):
+        """批量写入摘要筛选结果缓存"""
+        if not results:
+            return
+        
+        now = datetime.now().isoformat()
+        with self._get_connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO screening_cache (topic_hash, arxiv_id, result, created_at) VALUES (?, ?, ?, ?)",
+                [
+                    (topic_hash, arxiv_id, json_utils.dumps(result), now)
+                    for arxiv_id, result in results.items()
+                ]
+            )
+    
     # ==================== 统计信息 ====================
     
     def get_statistics(self, session_id: int = None) -> Dict[str, int]:
@@ -346,5 +622,33 @@ class Database:
             return stats
 
 
+class UpdateBuffer:
+    """论文更新缓冲区：累积更新，达到阈值或手动flush时批量写入（线程安全）"""
+    
+    def __init__(self, database: Database, flush_size: int = 32):
+        self.database = database
+        self.flush_size = flush_size
+        self._rows: List[Tuple[str, Dict[str, Any]]] = []
+        self._lock = threading.Lock()
+    
+    def add(self, arxiv_id: str, updates: Dict[str, Any]):
+        """添加一条更新"""
+        with self._lock:
+            self._rows.append((arxiv_id, updates))
+            if len(self._rows) >= self.flush_size:
+                self._flush_locked()
+    
+    def flush(self):
+        """写入所有待提交的更新"""
+        with self._lock:
+            self._flush_locked()
+    
+    def _flush_locked(self):
+        # 持锁写入，保证各批次按添加顺序落库
+        if self._rows:
+            rows, self._rows = self._rows, []
+            self.database.update_papers_bulk(rows)
+
+
 # 全局数据库实例
 db = Database()
@@ -1,43 +1,171 @@
 """
 arXiv论文检索模块
 """
-import arxiv
+import re
+import asyncio
+from contextlib import nullcontext
+from itertools import islice
+import xml.etree.ElementTree as ET
+import aiohttp
 from typing import List, Dict, Any, Optional
-from datetime import datetime
+from datetime import datetime, timezone
 from rich.console import Console
 from rich.progress import Progress, TaskID
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 
 from core.config import MAX_PAPERS_PER_SEARCH
 from core.db import db
+from utils.rate_limiter import AsyncRateLimiter, RETRYABLE_ERRORS, check_status, retry_after_seconds
 
 console = Console()
 
+# arXiv API配置
+ARXIV_API_URL = "https://export.arxiv.org/api/query"
+ARXIV_PAGE_SIZE = 100
+ARXIV_MAX_CONCURRENT_PAGES = 4
+# arXiv API最多返回前30000条结果，超出部分的start请求只会得到空页
+ARXIV_MAX_RESULTS = 30000
+# arXiv API使用条款要求每3秒不超过1个请求
+ARXIV_RATE_LIMIT = (1, 3.0)
+
+# Atom命名空间
+_ATOM_NS = {
+    'atom': 'http://www.w3.org/2005/Atom',
+    'arxiv': 'http://arxiv.org/schemas/atom',
+}
+
+_WHITESPACE_RE = re.compile(r'\s+')
+# 从entry id中提取不带版本号的arXiv ID
+_ARXIV_ID_RE = re.compile(r'(\d{4}\.\d{4,5})(?:v\d+)?$')
+
+
+class PaperRecord:
+    """检索到的论文记录（手写 __slots__ 以兼容 Python 3.10 以下版本）"""
+    __slots__ = (
+        'arxiv_id', 'title', 'authors', 'abstract', 'published_date',
+        'arxiv_url', 'pdf_url', 'status', 'search_session_id', 'id',
+    )
+    
+    def __init__(
+        self,
+        arxiv_id: str,
+        title: str,
+        authors: str,
+        abstract: str,
+        published_date: Optional[str],
+        arxiv_url: str,
+        pdf_url: Optional[str],
+        status: str = 'discovered',
+        search_session_id: Optional[int] = None,
+        id: Optional[int] = None
+    ):
+        self.arxiv_id = arxiv_id
+        self.title = title
+        self.authors = authors
+        self.abstract = abstract
+        self.published_date = published_date
+        self.arxiv_url = arxiv_url
+        self.pdf_url = pdf_url
+        self.status = status
+        self.search_session_id = search_session_id
+        self.id = id
+    
+    def __repr__(self) -> str:
+        return f"PaperRecord(arxiv_id={self.arxiv_id!r}, title={self.title!r})"
+    
+    def __getitem__(self, key: str) -> Any:
+        """兼容按字典方式读取字段（如 paper['arxiv_id']）"""
+        return getattr(self, key)
+    
+    def as_dict(self) -> Dict[str, Any]:
+        """转换为字典（用于写入数据库）"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
 
 class ArxivSearcher:
     """arXiv论文检索器"""
     
-    def __init__(self):
-        self.client = arxiv.Client()
+    def __init__(self, verbose: bool = False):
+        self.verbose = verbose
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._page_semaphore: Optional[asyncio.Semaphore] = None
+        self._limiter = AsyncRateLimiter(*ARXIV_RATE_LIMIT)
     
-    def search_papers(
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """获取（必要时创建）复用的HTTP会话
+        
+        会话与并发信号量绑定当前事件循环，close() 后在新的事件循环中重新创建；
+        限速器状态跨会话保留。
+        """
+        if self._session is None or self._session.closed:
+            self._page_semaphore = asyncio.Semaphore(ARXIV_MAX_CONCURRENT_PAGES)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=ARXIV_MAX_CONCURRENT_PAGES),
+                timeout=aiohttp.ClientTimeout(total=60)
+            )
+        return self._session
+    
+    async def close(self):
+        """关闭HTTP会话"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    @retry(
+        stop=stop_after_attempt(5),
+        wait=wait_exponential(multiplier=1, min=1, max=30),
+        # 截断的响应体会解析失败，同样重试
+        retry=retry_if_exception_type(RETRYABLE_ERRORS + (ET.ParseError,)),
+        reraise=True
+    )
+    async def _fetch_page(self, params: Dict[str, Any]) -> List[ET.Element]:
+        """
+        获取一页arXiv API结果
+        
+        Args:
+            params: API查询参数
+        
+        Returns:
+            Atom entry元素列表
+        """
+        session = await self._get_session()
+        async with self._page_semaphore, self._limiter:
+            async with session.get(ARXIV_API_URL, params=params) as response:
+                if response.status in (429, 503):
+                    # 服务端限流：按Retry-After推迟后续所有请求
+                    self._limiter.pause(retry_after_seconds(response.headers, ARXIV_RATE_LIMIT[1]))
+                # 429/5xx抛出可重试异常，其他非200状态（如400查询错误）直接失败
+                check_status(response.status)
+                body = await response.read()
+        
+        root = ET.fromstring(body)
+        return root.findall('atom:entry', _ATOM_NS)
+    
+    async def search_papers(
         self,
         keywords: List[str],
         session_id: int,
         max_results: int = None,
         offset: int = 0,
-        sort_by: arxiv.SortCriterion = arxiv.SortCriterion.SubmittedDate,
-        sort_order: arxiv.SortOrder = arxiv.SortOrder.Descending
-    ) -> List[Dict[str, Any]]:
+        sort_by: str = "submittedDate",
+        sort_order: str = "descending",
+        query: Optional[str] = None,
+        progress: Optional[Progress] = None,
+        task: Optional[TaskID] = None
+    ) -> List[PaperRecord]:
         """
-        根据关键词检索arXiv论文
+        根据关键词检索arXiv论文（多页并发获取）
         
         Args:
-            keywords: 关键词列表
+            keywords: 关键词列表（已传入query时忽略）
             session_id: 检索会话ID
             max_results: 最大结果数
-            offset: 检索偏移量（用于分页，跳过已检索的论文）
-            sort_by: 排序方式
-            sort_order: 排序顺序
+            offset: 检索偏移量（直接作为API的start参数，服务端跳过已检索的论文）
+            sort_by: 排序方式（relevance / lastUpdatedDate / submittedDate）
+            sort_order: 排序顺序（ascending / descending）
+            query: 预先构建的查询字符串（循环检索时由调用方构建一次）
+            progress: 调用方持有的进度条（跨批次共用），为空时临时创建
+            task: progress中对应的任务ID
         
         Returns:
             检索到的论文列表
@@ -45,51 +173,62 @@ class ArxivSearcher:
         max_results = max_results or MAX_PAPERS_PER_SEARCH
         
         # 构建查询字符串
-        query = self._build_query(keywords)
+        if query is None:
+            query = self.build_query(keywords)
         console.log(f"[blue]检索查询: {query} (偏移量: {offset}, 数量: {max_results})")
         
-        # 创建搜索对象
-        search = arxiv.Search(
-            query=query,
-            max_results=max_results,
-            sort_by=sort_by,
-            sort_order=sort_order
-        )
+        # 按页拆分请求，由API的start参数直接定位偏移量
+        end = min(offset + max_results, ARXIV_MAX_RESULTS)
+        page_params = [
+            {
+                'search_query': query,
+                'start': start,
+                'max_results': min(ARXIV_PAGE_SIZE, end - start),
+                'sortBy': sort_by,
+                'sortOrder': sort_order,
+            }
+            for start in range(offset, end, ARXIV_PAGE_SIZE)
+        ]
         
+        # 预先读取当前主题下已存在的论文（允许不同主题有相同论文）
+        seen_ids = set(db.get_all_arxiv_ids(session_id))
         papers = []
-        skipped_count = 0
         
-        with Progress() as progress:
-            task = progress.add_task("[cyan]检索arXiv论文...", total=None)
+        with (Progress() if progress is None else nullcontext(progress)) as progress:
+            if task is None:
+                task = progress.add_task("[cyan]检索arXiv论文...", total=None)
             
-            try:
-                for result in self.client.results(search):
-                    # 跳过偏移量之前的论文
-                    if skipped_count < offset:
-                        skipped_count += 1
-                        continue
-                    
-                    # 检查当前主题下是否已存在（允许不同主题有相同论文）
-                    if db.paper_exists(result.entry_id.split('/')[-1], session_id):
+            pages = await asyncio.gather(
+                *[self._fetch_page(params) for params in page_params],
+                return_exceptions=True
+            )
+            
+            for entries in pages:
+                if isinstance(entries, BaseException):
+                    console.log(f"[red]检索过程中出错: {entries}")
+                    continue
+                
+                for entry in entries:
+                    record = self._parse_arxiv_result(entry, session_id)
+                    if record.arxiv_id in seen_ids:
                         continue
+                    seen_ids.add(record.arxiv_id)
+                    papers.append(record)
                     
-                    paper_data = self._parse_arxiv_result(result, session_id)
-                    
-                    # 保存到数据库
-                    paper_id = db.add_paper(paper_data)
-                    paper_data['id'] = paper_id
-                    papers.append(paper_data)
-                    
-                    progress.update(task, advance=1)
-                    console.log(f"[green]发现新论文: {result.title[:60]}...")
-                    
-            except Exception as e:
-                console.log(f"[red]检索过程中出错: {e}")
+                    # 进度信息交给进度条按自身刷新频率渲染
+                    progress.update(task, advance=1, description=f"[cyan]检索中 {len(papers)}篇...")
+                    if self.verbose:
+                        console.log(f"[green]发现新论文: {record.title[:60]}...")
+        
+        # 一次事务批量保存到数据库
+        paper_ids = db.add_papers_bulk([record.as_dict() for record in papers])
+        for record, paper_id in zip(papers, paper_ids):
+            record.id = paper_id
         
         console.log(f"[green]共检索到 {len(papers)} 篇新论文")
         return papers
     
-    def _build_query(self, keywords: List[str]) -> str:
+    def build_query(self, keywords: List[str]) -> str:
         """
         构建arXiv查询字符串
         
@@ -116,26 +255,42 @@ class ArxivSearcher:
         
         return " OR ".join(processed_keywords)
     
-    def _parse_arxiv_result(self, result: arxiv.Result, session_id: int) -> Dict[str, Any]:
-        """解析arXiv结果为字典格式"""
-        # 提取arXiv ID
-        arxiv_id = result.entry_id.split('/')[-1]
-        if 'v' in arxiv_id:  # 移除版本号
-            arxiv_id = arxiv_id.split('v')[0]
-        
-        return {
-            'arxiv_id': arxiv_id,
-            'title': result.title,
-            'authors': ', '.join([author.name for author in result.authors]),
-            'abstract': result.summary,
-            'published_date': result.published.isoformat() if result.published else None,
-            'arxiv_url': result.entry_id,
-            'pdf_url': result.pdf_url,
-            'status': 'discovered',
-            'search_session_id': session_id
-        }
-    
-    def search_by_ids(self, arxiv_ids: List[str]) -> List[Dict[str, Any]]:
+    def _parse_arxiv_result(self, entry: ET.Element, session_id: int) -> PaperRecord:
+        """解析arXiv API返回的Atom entry为论文记录"""
+        entry_id = entry.findtext('atom:id', '', _ATOM_NS).strip()
+        
+        # 提取arXiv ID（移除版本号）
+        match = _ARXIV_ID_RE.search(entry_id)
+        arxiv_id = match.group(1) if match else entry_id.rpartition('/')[2].partition('v')[0]
+        
+        published = entry.findtext('atom:published', '', _ATOM_NS).strip()
+        published_date = None
+        if published:
+            published_date = datetime.strptime(published, '%Y-%m-%dT%H:%M:%SZ').replace(
+                tzinfo=timezone.utc
+            ).isoformat()
+        
+        pdf_url = None
+        for link in entry.findall('atom:link', _ATOM_NS):
+            if link.get('title') == 'pdf':
+                pdf_url = link.get('href')
+                break
+        
+        return PaperRecord(
+            arxiv_id=arxiv_id,
+            title=_WHITESPACE_RE.sub(' ', entry.findtext('atom:title', '', _ATOM_NS)).strip(),
+            authors=', '.join(
+                author.findtext('atom:name', '', _ATOM_NS)
+                for author in entry.iterfind('atom:author', _ATOM_NS)
+            ),
+            abstract=entry.findtext('atom:summary', '', _ATOM_NS).strip(),
+            published_date=published_date,
+            arxiv_url=entry_id,
+            pdf_url=pdf_url,
+            search_session_id=session_id
+        )
+    
+    async def search_by_ids(self, arxiv_ids: List[str]) -> List[PaperRecord]:
         """
         根据arXiv ID列表检索特定论文
         
@@ -145,32 +300,49 @@ class ArxivSearcher:
         Returns:
             论文列表
         """
-        papers = []
+        # arXiv API单次id_list查询最多支持100个ID，按块并发请求
+        ids = iter(arxiv_ids)
+        chunks = []
+        while chunk := list(islice(ids, ARXIV_PAGE_SIZE)):
+            chunks.append(chunk)
         
-        for arxiv_id in arxiv_ids:
-            try:
-                # 构建ID查询
-                search = arxiv.Search(id_list=[arxiv_id])
-                results = list(self.client.results(search))
-                
-                if results:
-                    result = results[0]
-                    paper_data = self._parse_arxiv_result(result, None)
-                    papers.append(paper_data)
-                    
-            except Exception as e:
-                console.log(f"[red]检索ID {arxiv_id} 时出错: {e}")
+        pages = await asyncio.gather(
+            *[
+                self._fetch_page({'id_list': ','.join(chunk), 'max_results': len(chunk)})
+                for chunk in chunks
+            ],
+            return_exceptions=True
+        )
+        
+        papers = []
+        for chunk, entries in zip(chunks, pages):
+            if isinstance(entries, BaseException):
+                console.log(f"[red]检索ID {', '.join(chunk)} 时出错: {entries}")
+                continue
+            papers.extend(self._parse_arxiv_result(entry, None) for entry in entries)
         
         return papers
 
 
+# 进程内共享的检索器（跨调用保留限速状态）
+_SEARCHER: Optional[ArxivSearcher] = None
+
+
+def get_searcher() -> ArxivSearcher:
+    """获取共享的ArxivSearcher实例"""
+    global _SEARCHER
+    if _SEARCHER is None:
+        _SEARCHER = ArxivSearcher()
+    return _SEARCHER
+
+
 # 便捷函数
 def search_papers(
     keywords: List[str],
     session_id: int,
     max_results: int = None,
     offset: int = 0
-) -> List[Dict[str, Any]]:
+) -> List[PaperRecord]:
     """
     便捷函数：检索arXiv论文
     
@@ -183,5 +355,31 @@ def search_papers(
     Returns:
         检索到的论文列表
     """
-    searcher = ArxivSearcher()
-    return searcher.search_papers(keywords, session_id, max_results, offset)
+    async def _search():
+        searcher = get_searcher()
+        try:
+            return await searcher.search_papers(keywords, session_id, max_results, offset)
+        finally:
+            await searcher.close()
+    
+    return asyncio.run(_search())
+
+
+def search_by_ids(arxiv_ids: List[str]) -> List[PaperRecord]:
+    """
+    便捷函数：根据arXiv ID列表检索特定论文（同步调用）
+    
+    Args:
+        arxiv_ids: arXiv ID列表
+    
+    Returns:
+        论文列表
+    """
+    async def _search():
+        searcher = get_searcher()
+        try:
+            return await searcher.search_by_ids(arxiv_ids)
+        finally:
+            await searcher.close()
+    
+    return asyncio.run(_search())
@@ -8,24 +8,36 @@ import asyncio
 import click
 import sys
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Tuple
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
+from rich.progress import Progress
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 # 添加项目根目录到路径
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
-from core.config import MAX_PAPERS_PER_SEARCH, MAX_PAPERS_FOR_ANALYSIS, RELEVANCE_SCORE_THRESHOLD
+from core.config import (
+    MAX_PAPERS_PER_SEARCH, MAX_PAPERS_FOR_ANALYSIS, RELEVANCE_SCORE_THRESHOLD, STATUS_NAMES
+)
 from core.db import db
-from core.searcher import search_papers
+from core.searcher import get_searcher
 from core.analyzer import PaperAnalyzer, generate_keywords_for_topic
-from utils.pdf_handler import PDFHandler
-from utils.exporter import ReportExporter
+from utils.pdf_handler import get_pdf_handler
+from utils.exporter import ReportExporter, TABLE_FORMAT_NAMES
 
 console = Console()
 
+# uvloop可用时替换默认事件循环，对后续所有asyncio.run生效
+if uvloop is not None:
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
 
 def print_banner():
     """打印程序横幅"""
@@ -46,43 +58,181 @@ def print_statistics(session_id: int):
     table.add_column("状态", style="cyan")
     table.add_column("数量", style="magenta")
     
-    status_names = {
-        'discovered': '已发现',
-        'abstract_screening': '摘要筛选中',
-        'relevant': '相关（待下载）',
-        'irrelevant': '不相关',
-        'pdf_downloading': 'PDF下载中',
-        'pdf_downloaded': 'PDF已下载',
-        'pdf_failed': 'PDF下载失败',
-        'analyzing': '深度分析中',
-        'analyzed': '分析完成',
-        'analysis_failed': '分析失败'
-    }
-    
     for status, count in stats.items():
-        name = status_names.get(status, status)
+        name = STATUS_NAMES.get(status, status)
         table.add_row(name, str(count))
     
     console.print(table)
 
 
-async def download_pdfs_for_papers(papers: List[dict]):
-    """为论文下载PDF"""
-    pdf_handler = PDFHandler()
+async def download_pdfs_for_papers(papers: List[dict], queue: Optional[asyncio.Queue] = None):
+    """为论文下载PDF（共享HTTP会话，限制并发数）
     
+    Args:
+        papers: 论文列表
+        queue: 传入时每篇下载成功的论文立即放入队列，供深度分析消费
+    """
     console.log(f"[blue]开始下载 {len(papers)} 篇论文的PDF...")
     
-    tasks = []
-    for paper in papers:
-        if paper.get('pdf_url'):
-            task = pdf_handler.download_pdf(paper['arxiv_id'], paper['pdf_url'])
-            tasks.append(task)
+    on_downloaded = None
+    if queue is not None:
+        titles = {paper['arxiv_id']: paper['title'] for paper in papers}
+        
+        async def on_downloaded(arxiv_id, pdf_path):
+            await queue.put({'arxiv_id': arxiv_id, 'title': titles[arxiv_id], 'pdf_path': str(pdf_path)})
     
     # 并发下载
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    items = [(paper['arxiv_id'], paper['pdf_url']) for paper in papers if paper.get('pdf_url')]
+    results = await get_pdf_handler().download_many(items, on_downloaded=on_downloaded)
     
-    success_count = sum(1 for r in results if r is not None and not isinstance(r, Exception))
-    console.log(f"[green]PDF下载完成: {success_count}/{len(tasks)} 成功")
+    success_count = sum(1 for r in results if r is not None)
+    console.log(f"[green]PDF下载完成: {success_count}/{len(items)} 成功")
+
+
+async def download_and_analyze(
+    analyzer: PaperAnalyzer,
+    papers_to_download: List[dict],
+    downloaded: List[dict],
+    research_topic: str
+):
+    """
+    下载PDF + 深度分析（流水线）：每篇PDF下载完成后立即开始分析
+    
+    Args:
+        analyzer: 分析器
+        papers_to_download: 待下载PDF的论文
+        downloaded: 已下载PDF、直接进入分析的论文
+        research_topic: 研究主题
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    for paper in downloaded:
+        queue.put_nowait(paper)
+    
+    analysis = asyncio.create_task(analyzer.process_full_analysis_queue(queue, research_topic))
+    try:
+        if papers_to_download:
+            await download_pdfs_for_papers(papers_to_download, queue)
+    finally:
+        # 下载全部结束，通知分析端
+        queue.put_nowait(None)
+        await analysis
+
+
+async def search_and_screen(
+    analyzer: PaperAnalyzer,
+    keywords_list: List[str],
+    session_id: int,
+    research_topic: str,
+    batch_size: int,
+    max_total_search: int,
+    relevant_target: int,
+    skip_screening: bool,
+    verbose: bool = False
+) -> Tuple[int, int, int]:
+    """
+    循环检索 + 摘要筛选（流水线）：筛选当前批次的同时检索下一批（最多预取一批）
+    
+    Returns:
+        (已筛选的检索数, 相关论文数, 已预取但未筛选的论文数)
+    """
+    searcher = get_searcher()
+    searcher.verbose = verbose
+    # 关键词不变，查询字符串只构建一次
+    query = searcher.build_query(keywords_list)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+    stop = asyncio.Event()
+    total_searched = 0
+    relevant_count = 0
+    
+    async def produce():
+        fetched = 0
+        current_offset = 0
+        iteration = 0
+        try:
+            while not stop.is_set():
+                iteration += 1
+                console.print(f"\n[bold yellow]=== 第 {iteration} 轮检索 ===")
+                console.print(f"[blue]当前偏移量: {current_offset}, 本轮检索: {batch_size}篇")
+                
+                # 步骤1: 检索一批论文
+                papers = await searcher.search_papers(
+                    keywords_list, session_id, batch_size, current_offset,
+                    query=query, progress=progress, task=search_task
+                )
+                fetched += len(papers)
+                
+                if len(papers) == 0:
+                    console.print("[yellow]没有更多新论文，停止检索")
+                    break
+                
+                console.print(f"[green]本轮检索到 {len(papers)} 篇新论文")
+                await queue.put(papers)
+                # 等筛选端取走该批次后再检索下一批，预取不超过一批
+                await queue.join()
+                
+                # 检查是否超过最大检索限制
+                if fetched >= max_total_search:
+                    console.print(f"[yellow]⚠ 已达到最大检索限制 ({max_total_search})，停止检索")
+                    break
+                
+                # 更新偏移量，准备下一轮
+                current_offset += batch_size
+        finally:
+            # 通知筛选端没有更多批次（已被筛选端叫停时无需通知）
+            if not stop.is_set():
+                await queue.put(None)
+    
+    async def consume():
+        nonlocal total_searched, relevant_count
+        while True:
+            papers = await queue.get()
+            # 取走即通知检索端，筛选本批次的同时可检索下一批
+            queue.task_done()
+            if papers is None:
+                break
+            
+            # 步骤2: 摘要筛选（刚检索到的论文）
+            if not skip_screening:
+                console.print(f"[blue]对本轮 {len(papers)} 篇论文进行摘要筛选...")
+                await analyzer.process_abstract_screening(papers, research_topic, keywords_list)
+            total_searched += len(papers)
+            
+            # 检查当前相关论文数量
+            # 计数查询放到线程中执行，不阻塞同一事件循环上的预取检索
+            relevant_count = await asyncio.to_thread(db.count_papers_by_status, 'relevant', session_id)
+            console.print(f"[green]当前相关论文总数: {relevant_count}/{relevant_target}")
+            
+            # 判断是否达到目标
+            if relevant_count >= relevant_target:
+                console.print(f"[bold green]✓ 已达到第二层漏斗目标 ({relevant_count} >= {relevant_target})")
+                stop.set()
+                break
+            
+            console.print(f"[blue]相关论文不足，继续下一轮检索...")
+    
+    # 所有批次共用一个进度条
+    with Progress(console=console) as progress:
+        search_task = progress.add_task("[cyan]检索arXiv论文...", total=None)
+        producer = asyncio.create_task(produce())
+        try:
+            await consume()
+        finally:
+            # 达到目标（或筛选出错）后停止仍在进行的预取
+            stop.set()
+            producer.cancel()
+            result, = await asyncio.gather(producer, return_exceptions=True)
+            if isinstance(result, Exception):
+                console.print(f"[red]检索过程中出错: {result}")
+            await searcher.close()
+    
+    # 达到目标时已预取的批次：已入库（状态为discovered）但未筛选
+    prefetched = 0
+    while not queue.empty():
+        papers = queue.get_nowait()
+        if papers:
+            prefetched += len(papers)
+    
+    return total_searched, relevant_count, prefetched
 
 
 @click.command()
@@ -98,6 +248,8 @@ async def download_pdfs_for_papers(papers: List[dict]):
 @click.option('--skip-analysis', is_flag=True, help='跳过深度分析')
 @click.option('--session-id', type=int, help='指定已有会话ID，用于增量更新')
 @click.option('--export-only', is_flag=True, help='仅导出结果，不执行其他操作')
+@click.option('--verbose', '-v', is_flag=True, help='输出每篇新发现论文的详细日志')
+@click.option('--format', 'export_format', type=click.Choice(list(TABLE_FORMAT_NAMES)), default='xlsx', help='结果表格格式（xlsx / csv），默认xlsx')
 def main(
     topic: str,
     keywords: tuple,
@@ -110,7 +262,9 @@ def main(
     skip_download: bool,
     skip_analysis: bool,
     session_id: int,
-    export_only: bool
+    export_only: bool,
+    verbose: bool,
+    export_format: str
 ):
     """
     学术论文智能检索与分析系统 - 漏斗式过滤
@@ -184,10 +338,10 @@ def main(
     if export_only:
         console.print("[blue]仅导出模式...")
         exporter = ReportExporter()
-        excel_path, md_path = exporter.export_session_results(session_id)
-        if excel_path and md_path:
+        table_path, md_path = exporter.export_session_results(session_id, export_format)
+        if table_path and md_path:
             console.print(f"[green]导出成功!")
-            console.print(f"  Excel: {excel_path}")
+            console.print(f"  {TABLE_FORMAT_NAMES[export_format]}: {table_path}")
             console.print(f"  Markdown: {md_path}")
         return
     
@@ -199,62 +353,27 @@ def main(
         console.print("\n[bold cyan]步骤 1-2: 循环检索 + 摘要筛选（漏斗式检索）...")
         
         # 初始化检索参数
-        current_offset = 0
         batch_size = max_search  # 每批检索数量
         max_total_search = 500  # 最多检索总数（防止无限循环）
         relevant_target = max_analysis  # 第二层漏斗目标
         
-        total_searched = 0
-        iteration = 0
-        relevant_count = 0  # 初始化相关论文计数
-        
-        while True:
-            iteration += 1
-            console.print(f"\n[bold yellow]=== 第 {iteration} 轮检索 ===")
-            console.print(f"[blue]当前偏移量: {current_offset}, 本轮检索: {batch_size}篇")
-            
-            # 步骤1: 检索一批论文
-            papers = search_papers(keywords_list, session_id, batch_size, current_offset)
-            total_searched += len(papers)
-            
-            if len(papers) == 0:
-                console.print("[yellow]没有更多新论文，停止检索")
-                break
-            
-            console.print(f"[green]本轮检索到 {len(papers)} 篇新论文")
-            
-            # 步骤2: 摘要筛选（刚检索到的论文）
-            if not skip_screening:
-                console.print(f"[blue]对本轮 {len(papers)} 篇论文进行摘要筛选...")
-                asyncio.run(analyzer.process_abstract_screening(papers, research_topic))
-            
-            # 检查当前相关论文数量
-            all_relevant = db.get_papers_by_status('relevant', session_id)
-            relevant_count = len(all_relevant)
-            console.print(f"[green]当前相关论文总数: {relevant_count}/{relevant_target}")
-            
-            # 判断是否达到目标
-            if relevant_count >= relevant_target:
-                console.print(f"[bold green]✓ 已达到第二层漏斗目标 ({relevant_count} >= {relevant_target})")
-                break
-            
-            # 检查是否超过最大检索限制
-            if total_searched >= max_total_search:
-                console.print(f"[yellow]⚠ 已达到最大检索限制 ({max_total_search})，停止检索")
-                break
-            
-            # 更新偏移量，准备下一轮
-            current_offset += batch_size
-            console.print(f"[blue]相关论文不足，继续下一轮检索...")
+        total_searched, relevant_count, prefetched = asyncio.run(search_and_screen(
+            analyzer, keywords_list, session_id, research_topic,
+            batch_size, max_total_search, relevant_target, skip_screening, verbose
+        ))
         
         console.print(f"\n[bold green]检索完成: 共检索 {total_searched} 篇，筛选出 {relevant_count} 篇相关论文")
+        if prefetched:
+            console.print(f"[yellow]另有 {prefetched} 篇预取论文未筛选（状态为discovered，可使用 --skip-search 继续筛选）")
     else:
         console.print("\n[yellow]跳过检索步骤")
         if not skip_screening:
             console.print("\n[bold cyan]步骤 2: 摘要筛选（已有数据）...")
-            papers_to_screen = db.get_papers_by_status('discovered', session_id)
+            papers_to_screen = db.get_papers_by_status_cols(
+                'discovered', ('arxiv_id', 'title', 'abstract'), session_id
+            )
             if papers_to_screen:
-                asyncio.run(analyzer.process_abstract_screening(papers_to_screen, research_topic))
+                asyncio.run(analyzer.process_abstract_screening(papers_to_screen, research_topic, keywords_list))
             else:
                 console.print("[yellow]没有需要筛选的论文")
     
@@ -263,28 +382,25 @@ def main(
     if not skip_download:
         console.print("\n[bold cyan]步骤 3: 下载PDF（第二层漏斗 - 精读上限）...")
         # 获取所有会话中与当前研究主题匹配的相关论文
-        all_relevant = db.get_papers_by_status('relevant', research_topic=research_topic)
-        # 过滤掉低于阈值的
-        filtered = [p for p in all_relevant if p.get('relevance_score', 0) >= relevance_threshold]
-        # 按分数排序，取前max_analysis篇
-        sorted_papers = sorted(filtered, key=lambda x: x.get('relevance_score', 0), reverse=True)
-        papers_to_download = sorted_papers[:max_analysis]
+        relevant_total, passed_count = db.count_relevant(research_topic, relevance_threshold)
+        # 在SQL中完成阈值过滤与排序，取前max_analysis篇
+        papers_to_download = db.get_top_relevant(research_topic, relevance_threshold, max_analysis)
         
-        # 标记不进入精读的论文
-        excluded = sorted_papers[max_analysis:]
-        for paper in excluded:
-            db.update_paper(paper['arxiv_id'], {
-                'status': 'irrelevant',
-                'relevance_reason': paper.get('relevance_reason', '') + f' [未进入精读: 排名>{max_analysis}]'
-            })
+        # 一次性标记不进入精读的论文
+        db.exclude_relevant_beyond(
+            research_topic, relevance_threshold, max_analysis, f' [未进入精读: 排名>{max_analysis}]'
+        )
         
-        console.print(f"[blue]主题'{research_topic[:30]}...'的相关论文: {len(all_relevant)}篇, 超过阈值({relevance_threshold}): {len(filtered)}篇, 进入精读: {len(papers_to_download)}篇")
+        console.print(f"[blue]主题'{research_topic[:30]}...'的相关论文: {relevant_total}篇, 超过阈值({relevance_threshold}): {passed_count}篇, 进入精读: {len(papers_to_download)}篇")
         
-        if papers_to_download:
+        if not papers_to_download:
+            console.print("[yellow]没有需要下载的论文")
+        elif skip_analysis:
             asyncio.run(download_pdfs_for_papers(papers_to_download))
         else:
-            console.print("[yellow]没有需要下载的论文")
+            console.print("[blue]PDF下载与深度分析并行进行（步骤 3-4）")
     else:
+        papers_to_download = []
         console.print("\n[yellow]跳过PDF下载")
     
     # 步骤4: 深度分析
@@ -292,9 +408,14 @@ def main(
     if not skip_analysis:
         console.print("\n[bold cyan]步骤 4: 深度分析...")
         # 获取所有已下载PDF且与当前研究主题匹配的论文
-        all_downloaded = db.get_papers_by_status('pdf_downloaded')
-        papers_to_analyze = [p for p in all_downloaded if p.get('research_topic') == research_topic]
-        if papers_to_analyze:
+        papers_to_analyze = db.get_papers_by_status_cols(
+            'pdf_downloaded', ('arxiv_id', 'title', 'pdf_path'), research_topic=research_topic
+        )
+        if papers_to_download:
+            # 已下载的论文立即开始分析，新下载的论文下载完成后陆续加入
+            console.print(f"[blue]已下载 {len(papers_to_analyze)} 篇，另有 {len(papers_to_download)} 篇下载后分析")
+            asyncio.run(download_and_analyze(analyzer, papers_to_download, papers_to_analyze, research_topic))
+        elif papers_to_analyze:
             console.print(f"[blue]共 {len(papers_to_analyze)} 篇论文需要深度分析")
             asyncio.run(analyzer.process_full_analysis(papers_to_analyze, research_topic))
         else:
@@ -327,11 +448,11 @@ def main(
     # 导出结果
     console.print("\n[bold cyan]导出结果...")
     exporter = ReportExporter()
-    excel_path, md_path = exporter.export_session_results(session_id)
+    table_path, md_path = exporter.export_session_results(session_id, export_format)
     
-    if excel_path and md_path:
+    if table_path and md_path:
         console.print(f"[green]导出成功!")
-        console.print(f"  Excel: {excel_path}")
+        console.print(f"  {TABLE_FORMAT_NAMES[export_format]}: {table_path}")
         console.print(f"  Markdown: {md_path}")
     
     console.print("\n[bold green]处理完成!")
@@ -346,16 +467,17 @@ def stats(session_id: int):
 
 @click.command()
 @click.option('--session-id', '-s', required=True, type=int, help='会话ID')
-def export(session_id: int):
+@click.option('--format', 'export_format', type=click.Choice(list(TABLE_FORMAT_NAMES)), default='xlsx', help='结果表格格式（xlsx / csv），默认xlsx')
+def export(session_id: int, export_format: str):
     """导出指定会话的结果"""
     console.print(f"[blue]导出会话 {session_id} 的结果...")
     
     exporter = ReportExporter()
-    excel_path, md_path = exporter.export_session_results(session_id)
+    table_path, md_path = exporter.export_session_results(session_id, export_format)
     
-    if excel_path and md_path:
+    if table_path and md_path:
         console.print(f"[green]导出成功!")
-        console.print(f"  Excel: {excel_path}")
+        console.print(f"  {TABLE_FORMAT_NAMES[export_format]}: {table_path}")
         console.print(f"  Markdown: {md_path}")
     else:
         console.print("[red]导出失败")
@@ -1,11 +1,12 @@
 """
 导出模块 - 生成Excel和Markdown报告
 """
-import json
+import io
+import csv
+from collections import Counter, defaultdict
 from typing import List, Dict, Any
 from datetime import datetime
 from pathlib import Path
-import pandas as pd
 from rich.console import Console
 
 from core.config import OUTPUT_PATH
@@ -13,6 +14,73 @@ from core.db import db
 
 console = Console()
 
+# Excel列定义：(列标题, 论文字段, 缺省值)
+_EXCEL_COLUMNS = (
+    ('论文标题', 'title', ''),
+    ('arXiv ID', 'arxiv_id', ''),
+    ('论文地址', 'arxiv_url', ''),
+    ('发布时间', 'published_date', ''),
+    ('作者', 'authors', ''),
+    ('论文摘要', 'abstract', ''),
+    ('改进方向分类', 'improvement_category', ''),
+    ('相关度分数', 'relevance_score', 0),
+    
+    # 核心要素
+    ('问题定义', 'problem_definition', ''),
+    ('数学建模', 'mathematical_modeling', ''),
+    ('核心创新', 'core_innovation', ''),
+    ('理论保证', 'theoretical_guarantee', ''),
+    ('实验设计', 'experimental_design', ''),
+    ('量化效果', 'quantitative_results', ''),
+    ('局限性', 'limitations', ''),
+    ('创新思路', 'innovation_ideas', ''),
+    
+    # 元信息
+    ('处理状态', 'status', ''),
+    ('筛选理由', 'relevance_reason', ''),
+)
+_EXCEL_HEADER = tuple(title for title, _, _ in _EXCEL_COLUMNS)
+_EXCEL_FIELDS = tuple((key, default) for _, key, default in _EXCEL_COLUMNS)
+
+# 支持的结果表格格式及显示名称
+TABLE_FORMAT_NAMES = {'xlsx': 'Excel', 'csv': 'CSV'}
+
+# Markdown报告中单篇论文的段落模板
+PAPER_TEMPLATE = """### {idx}. {title}
+
+**作者**: {authors}
+
+**发布时间**: {published_date}
+
+**arXiv链接**: {arxiv_url}
+
+**改进方向**: {improvement_category}
+
+#### 核心要素
+
+**问题定义**: {problem_definition}
+
+**数学建模**: {mathematical_modeling}
+
+**核心创新**: {core_innovation}
+
+**理论保证**: {theoretical_guarantee}
+
+**实验设计**: {experimental_design}
+
+**量化效果**: {quantitative_results}
+
+**局限性**: {limitations}
+
+**创新思路**: {innovation_ideas}
+
+#### 摘要
+
+{abstract}
+
+---
+"""
+
 
 class ReportExporter:
     """报告导出器"""
@@ -38,62 +106,102 @@ class ReportExporter:
         
         output_path = self.output_dir / filename
         
-        # 准备数据
-        data = []
+        # 延迟导入：仅导出Excel时需要，避免拖慢CLI启动；优先使用更快的xlsxwriter
+        try:
+            import xlsxwriter
+        except ImportError:
+            xlsxwriter = None
+        
+        if xlsxwriter is not None:
+            self._write_excel_xlsxwriter(xlsxwriter, papers, output_path)
+        else:
+            self._write_excel_openpyxl(papers, output_path)
+        
+        console.log(f"[green]Excel导出成功: {output_path}")
+        return output_path
+    
+    @staticmethod
+    def _excel_rows(papers: List[Dict[str, Any]], widths: List[int]):
+        """逐篇生成Excel行数据，同时更新每列最大宽度"""
         for paper in papers:
-            row = {
-                '论文标题': paper.get('title', ''),
-                'arXiv ID': paper.get('arxiv_id', ''),
-                '论文地址': paper.get('arxiv_url', ''),
-                '发布时间': paper.get('published_date', ''),
-                '作者': paper.get('authors', ''),
-                '论文摘要': paper.get('abstract', ''),
-                '改进方向分类': paper.get('improvement_category', ''),
-                '相关度分数': paper.get('relevance_score', 0),
-                
-                # 核心要素
-                '问题定义': paper.get('problem_definition', ''),
-                '数学建模': paper.get('mathematical_modeling', ''),
-                '核心创新': paper.get('core_innovation', ''),
-                '理论保证': paper.get('theoretical_guarantee', ''),
-                '实验设计': paper.get('experimental_design', ''),
-                '量化效果': paper.get('quantitative_results', ''),
-                '局限性': paper.get('limitations', ''),
-                '创新思路': paper.get('innovation_ideas', ''),
-                
-                # 元信息
-                '处理状态': paper.get('status', ''),
-                '筛选理由': paper.get('relevance_reason', ''),
-            }
-            data.append(row)
-        
-        # 创建DataFrame
-        df = pd.DataFrame(data)
-        
-        # 导出到Excel，使用openpyxl引擎以支持更多格式
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='论文分析')
+            get = paper.get
+            row = tuple(get(key, default) for key, default in _EXCEL_FIELDS)
+            for i, value in enumerate(row):
+                if value:
+                    length = len(value) if isinstance(value, str) else len(str(value))
+                    if length > widths[i]:
+                        widths[i] = length
+            yield row
+    
+    def _write_excel_xlsxwriter(self, xlsxwriter, papers: List[Dict[str, Any]], output_path: Path):
+        """使用xlsxwriter常量内存模式写入：每行写完即落盘，内存占用与论文数无关"""
+        workbook = xlsxwriter.Workbook(
+            str(output_path),
+            {'constant_memory': True, 'strings_to_urls': False}
+        )
+        try:
+            worksheet = workbook.add_worksheet('论文分析')
+            widths = [len(title) for title in _EXCEL_HEADER]
             
-            # 获取工作表以调整列宽
-            worksheet = writer.sheets['论文分析']
+            worksheet.write_row(0, 0, _EXCEL_HEADER)
+            for row_idx, row in enumerate(self._excel_rows(papers, widths), 1):
+                worksheet.write_row(row_idx, 0, row)
             
-            # 调整列宽
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                
-                for cell in column:
-                    try:
-                        if cell.value:
-                            max_length = max(max_length, len(str(cell.value)))
-                    except:
-                        pass
-                
-                # 设置列宽，最大50
-                adjusted_width = min(max_length + 2, 50)
-                worksheet.column_dimensions[column_letter].width = adjusted_width
+            # 设置列宽，最大50（列信息在保存时写出，可在写完数据后设置）
+            for i, width in enumerate(widths):
+                worksheet.set_column(i, i, min(width + 2, 50))
+        finally:
+            workbook.close()
+    
+    def _write_excel_openpyxl(self, papers: List[Dict[str, Any]], output_path: Path):
+        """未安装xlsxwriter时使用openpyxl只写模式写入"""
+        from openpyxl import Workbook
+        from openpyxl.utils import get_column_letter
+        
+        # 准备数据，同时计算每列最大宽度
+        widths = [len(title) for title in _EXCEL_HEADER]
+        rows = list(self._excel_rows(papers, widths))
+        
+        # 只写模式流式写入，不为每个单元格构造完整的Cell对象
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet('论文分析')
+        
+        # 设置列宽，最大50（只写模式下需在写入行之前设置）
+        for i, width in enumerate(widths, 1):
+            worksheet.column_dimensions[get_column_letter(i)].width = min(width + 2, 50)
+        
+        worksheet.append(_EXCEL_HEADER)
+        for row in rows:
+            worksheet.append(row)
+        workbook.save(output_path)
+    
+    def export_to_csv(self, papers: List[Dict[str, Any]], filename: str = None) -> Path:
+        """
+        导出论文数据到CSV（不依赖openpyxl，适合大批量导出）
         
-        console.log(f"[green]Excel导出成功: {output_path}")
+        Args:
+            papers: 论文列表
+            filename: 输出文件名
+        
+        Returns:
+            输出文件路径
+        """
+        if not filename:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"papers_analysis_{timestamp}.csv"
+        
+        output_path = self.output_dir / filename
+        
+        # utf-8-sig 带BOM，Excel直接打开时中文不乱码
+        with open(output_path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(_EXCEL_HEADER)
+            writer.writerows(
+                tuple(paper.get(key, default) for key, default in _EXCEL_FIELDS)
+                for paper in papers
+            )
+        
+        console.log(f"[green]CSV导出成功: {output_path}")
         return output_path
     
     def generate_markdown_report(
@@ -124,134 +232,109 @@ class ReportExporter:
         # 获取会话信息
         session_info = db.get_session(session_id) if session_id else None
         
-        # 生成报告内容
-        lines = []
+        # 按（分类, 相关度降序）排序一次，详细分析与分类汇总共用同一顺序
+        papers = sorted(papers, key=lambda p: (
+            p.get('improvement_category') or '其他',
+            -(p.get('relevance_score') or 0)
+        ))
+        
+        # 生成报告内容（写入内存缓冲区，最后一次性写盘）
+        buf = io.StringIO()
+        write = buf.write
         
         # 标题
-        lines.append(f"# 文献综述报告：{research_topic}")
-        lines.append("")
-        lines.append(f"**生成时间**: {datetime.now().strftime('%Y年%m月%d日 %H:%M')}")
-        lines.append("")
+        write(f"# 文献综述报告：{research_topic}\n\n")
+        write(f"**生成时间**: {datetime.now().strftime('%Y年%m月%d日 %H:%M')}\n\n")
         
         # 概述
-        lines.append("## 一、检索概述")
-        lines.append("")
+        write("## 一、检索概述\n\n")
         
         if session_info:
-            lines.append(f"- **研究主题**: {session_info['research_topic']}")
-            lines.append(f"- **检索关键词**: {', '.join(session_info['keywords'])}")
-            lines.append(f"- **检索时间**: {session_info['created_at']}")
+            write(f"- **研究主题**: {session_info['research_topic']}\n")
+            write(f"- **检索关键词**: {', '.join(session_info['keywords'])}\n")
+            write(f"- **检索时间**: {session_info['created_at']}\n")
         
-        lines.append(f"- **分析论文总数**: {len(papers)} 篇")
-        lines.append("")
+        write(f"- **分析论文总数**: {len(papers)} 篇\n\n")
         
         # 分类统计
-        lines.append("### 改进方向分布")
-        lines.append("")
+        write("### 改进方向分布\n\n")
         
-        category_count = {}
+        # 单次遍历按分类分组（论文已排序，分组天然按分类有序）
+        by_cat = defaultdict(list)
         for paper in papers:
-            cat = paper.get('improvement_category', '其他')
-            category_count[cat] = category_count.get(cat, 0) + 1
+            by_cat[paper.get('improvement_category') or '其他'].append(paper)
+        category_count = Counter({cat: len(cat_papers) for cat, cat_papers in by_cat.items()})
         
-        for cat, count in sorted(category_count.items(), key=lambda x: x[1], reverse=True):
-            lines.append(f"- {cat}: {count} 篇")
-        lines.append("")
+        for cat, count in category_count.most_common():
+            write(f"- {cat}: {count} 篇\n")
+        write("\n")
         
         # 论文详细分析
-        lines.append("## 二、论文详细分析")
-        lines.append("")
+        write("## 二、论文详细分析\n\n")
         
         for i, paper in enumerate(papers, 1):
-            lines.append(f"### {i}. {paper.get('title', '无标题')}")
-            lines.append("")
-            lines.append(f"**作者**: {paper.get('authors', '未知')}")
-            lines.append("")
-            lines.append(f"**发布时间**: {paper.get('published_date', '未知')}")
-            lines.append("")
-            lines.append(f"**arXiv链接**: {paper.get('arxiv_url', '')}")
-            lines.append("")
-            lines.append(f"**改进方向**: {paper.get('improvement_category', '未分类')}")
-            lines.append("")
-            
-            # 核心要素
-            lines.append("#### 核心要素")
-            lines.append("")
-            lines.append(f"**问题定义**: {paper.get('problem_definition', '未分析')}")
-            lines.append("")
-            lines.append(f"**数学建模**: {paper.get('mathematical_modeling', '未分析')}")
-            lines.append("")
-            lines.append(f"**核心创新**: {paper.get('core_innovation', '未分析')}")
-            lines.append("")
-            lines.append(f"**理论保证**: {paper.get('theoretical_guarantee', '未分析')}")
-            lines.append("")
-            lines.append(f"**实验设计**: {paper.get('experimental_design', '未分析')}")
-            lines.append("")
-            lines.append(f"**量化效果**: {paper.get('quantitative_results', '未分析')}")
-            lines.append("")
-            lines.append(f"**局限性**: {paper.get('limitations', '未分析')}")
-            lines.append("")
-            lines.append(f"**创新思路**: {paper.get('innovation_ideas', '未分析')}")
-            lines.append("")
-            
-            # 摘要
-            lines.append("#### 摘要")
-            lines.append("")
-            lines.append(paper.get('abstract', '无摘要'))
-            lines.append("")
-            lines.append("---")
-            lines.append("")
+            write(PAPER_TEMPLATE.format(
+                idx=i,
+                title=paper.get('title', '无标题'),
+                authors=paper.get('authors', '未知'),
+                published_date=paper.get('published_date', '未知'),
+                arxiv_url=paper.get('arxiv_url', ''),
+                improvement_category=paper.get('improvement_category', '未分类'),
+                problem_definition=paper.get('problem_definition', '未分析'),
+                mathematical_modeling=paper.get('mathematical_modeling', '未分析'),
+                core_innovation=paper.get('core_innovation', '未分析'),
+                theoretical_guarantee=paper.get('theoretical_guarantee', '未分析'),
+                experimental_design=paper.get('experimental_design', '未分析'),
+                quantitative_results=paper.get('quantitative_results', '未分析'),
+                limitations=paper.get('limitations', '未分析'),
+                innovation_ideas=paper.get('innovation_ideas', '未分析'),
+                abstract=paper.get('abstract', '无摘要')
+            ))
+            write("\n")
         
         # 总结与展望
-        lines.append("## 三、总结与展望")
-        lines.append("")
+        write("## 三、总结与展望\n\n")
         
         # 按分类汇总创新点
-        lines.append("### 各方向核心创新汇总")
-        lines.append("")
-        
-        for category in sorted(category_count.keys()):
-            cat_papers = [p for p in papers if p.get('improvement_category') == category]
-            if cat_papers:
-                lines.append(f"#### {category}")
-                lines.append("")
-                for p in cat_papers:
-                    lines.append(f"- **{p.get('title', '无标题')}**: {p.get('core_innovation', '未分析')}")
-                lines.append("")
+        write("### 各方向核心创新汇总\n\n")
+        
+        for category, cat_papers in by_cat.items():
+            write(f"#### {category}\n\n")
+            for p in cat_papers:
+                write(f"- **{p.get('title', '无标题')}**: {p.get('core_innovation', '未分析')}\n")
+            write("\n")
         
         # 潜在研究方向
-        lines.append("### 潜在研究方向")
-        lines.append("")
+        write("### 潜在研究方向\n\n")
         
         all_ideas = []
         for paper in papers:
             ideas = paper.get('innovation_ideas', '')
             if ideas and ideas != '未明确提及' and ideas != '分析失败':
-                all_ideas.append(f"- 来自《{paper.get('title', '无标题')}》: {ideas}")
+                all_ideas.append(f"- 来自《{paper.get('title', '无标题')}》: {ideas}\n")
         
         if all_ideas:
-            lines.extend(all_ideas[:20])  # 最多显示20个
+            write(''.join(all_ideas[:20]))  # 最多显示20个
         else:
-            lines.append("- 待进一步分析...")
-        
-        lines.append("")
+            write("- 待进一步分析...\n")
         
-        # 写入文件
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(lines))
+        # 写入文件（单次写入，固定使用\n换行，跳过平台换行符转换）
+        with open(output_path, 'w', encoding='utf-8', newline='\n') as f:
+            f.write(buf.getvalue())
         
         console.log(f"[green]Markdown报告生成成功: {output_path}")
         return output_path
     
-    def export_session_results(self, session_id: int) -> tuple:
+    def export_session_results(self, session_id: int, export_format: str = 'xlsx') -> tuple:
         """
         导出会话的所有结果
         
         Args:
             session_id: 检索会话ID
+            export_format: 表格格式（xlsx / csv）
         
         Returns:
-            (excel路径, markdown路径)
+            (表格路径, markdown路径)
         """
         # 获取会话信息
         session = db.get_session(session_id)
@@ -270,11 +353,17 @@ class ReportExporter:
         # 生成文件名前缀
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
-        # 导出Excel
-        excel_path = self.export_to_excel(
-            papers, 
-            filename=f"papers_{session_id}_{timestamp}.xlsx"
-        )
+        # 导出表格
+        if export_format == 'csv':
+            table_path = self.export_to_csv(
+                papers,
+                filename=f"papers_{session_id}_{timestamp}.csv"
+            )
+        else:
+            table_path = self.export_to_excel(
+                papers, 
+                filename=f"papers_{session_id}_{timestamp}.xlsx"
+            )
         
         # 生成Markdown报告
         md_path = self.generate_markdown_report(
@@ -284,7 +373,7 @@ class ReportExporter:
             filename=f"report_{session_id}_{timestamp}.md"
         )
         
-        return excel_path, md_path
+        return table_path, md_path
 
 
 # 便捷函数
@@ -294,6 +383,12 @@ def export_papers_to_excel(papers: List[Dict[str, Any]], filename: str = None) -
     return exporter.export_to_excel(papers, filename)
 
 
+def export_papers_to_csv(papers: List[Dict[str, Any]], filename: str = None) -> Path:
+    """便捷函数：导出论文到CSV"""
+    exporter = ReportExporter()
+    return exporter.export_to_csv(papers, filename)
+
+
 def generate_literature_review(
     papers: List[Dict[str, Any]], 
     research_topic: str,
@@ -2,19 +2,33 @@
 PDF下载和解析模块
 """
 import os
+import re
+import asyncio
+import threading
 import aiohttp
-import aiofiles
-import fitz  # PyMuPDF
-from typing import Optional
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 from pathlib import Path
 from rich.console import Console
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 
-from core.config import PDF_DOWNLOAD_PATH
-from core.db import db
+from core.config import PDF_DOWNLOAD_PATH, PDF_MAX_CONCURRENT_DOWNLOADS
+from core.db import db, UpdateBuffer
+from utils.rate_limiter import (
+    AsyncRateLimiter, RETRYABLE_ERRORS, check_status, retry_after_seconds
+)
 
 console = Console()
 
+# PDF下载限速（每秒请求数）
+PDF_RATE_LIMIT = (4, 1.0)
+# PyMuPDF不支持多线程并发使用（即使是不同文档），解析时串行持有该锁
+_FITZ_LOCK = threading.Lock()
+
+# 下载写盘的分块大小：大块减少await和线程池写入次数
+PDF_CHUNK_SIZE = 256 * 1024
+# 换行及其两侧的空白（含连续空行），整体压缩为单个换行
+_LINE_BREAK_RE = re.compile(r'\s*\n\s*')
+
 
 class PDFHandler:
     """PDF处理器"""
@@ -22,24 +36,66 @@ class PDFHandler:
     def __init__(self, download_path: Path = None):
         self.download_path = download_path or PDF_DOWNLOAD_PATH
         self.download_path.mkdir(parents=True, exist_ok=True)
+        self._limiter = AsyncRateLimiter(*PDF_RATE_LIMIT)
+        # 批量下载中正在进行的下载：arXiv ID -> 下载结果Future（仅驻留内存，不写库）
+        self._in_flight: Dict[str, asyncio.Future] = {}
     
     @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10)
+        stop=stop_after_attempt(5),
+        wait=wait_exponential(multiplier=1, min=1, max=30),
+        retry=retry_if_exception_type(RETRYABLE_ERRORS),
+        reraise=True
     )
-    async def download_pdf(self, arxiv_id: str, pdf_url: str) -> Optional[Path]:
+    async def _fetch_pdf(self, session: aiohttp.ClientSession, pdf_url: str, pdf_path: Path):
+        """请求PDF并写入文件（限流、服务端错误、网络错误时由tenacity指数退避重试）"""
+        async with self._limiter:
+            async with session.get(pdf_url, timeout=aiohttp.ClientTimeout(total=120)) as response:
+                if response.status in (429, 503):
+                    # 服务端限流：按Retry-After推迟后续所有请求
+                    self._limiter.pause(retry_after_seconds(response.headers, PDF_RATE_LIMIT[1]))
+                # 429/5xx抛出可重试异常，其他非200状态（如404）直接失败
+                check_status(response.status)
+                
+                import aiofiles  # 延迟导入：仅下载时需要
+                
+                # 压缩传输时Content-Length为压缩后的长度，与解压后的数据不符，不做长度校验
+                size = None if 'Content-Encoding' in response.headers else response.content_length
+                
+                # 分块直接写入文件，同时校验响应长度（截断或超长时抛出异常触发重试）
+                received = 0
+                async with aiofiles.open(pdf_path, 'wb') as f:
+                    async for chunk in response.content.iter_chunked(PDF_CHUNK_SIZE):
+                        received += len(chunk)
+                        if size is not None and received > size:
+                            raise aiohttp.ClientPayloadError("响应长度超过Content-Length")
+                        await f.write(chunk)
+                if size is not None and received != size:
+                    raise aiohttp.ClientPayloadError(f"响应不完整: {received}/{size} 字节")
+    
+    async def download_pdf(
+        self,
+        arxiv_id: str,
+        pdf_url: str,
+        session: Optional[aiohttp.ClientSession] = None,
+        update_buffer: Optional[UpdateBuffer] = None
+    ) -> Optional[Path]:
         """
         异步下载PDF文件
         
         Args:
             arxiv_id: arXiv ID
             pdf_url: PDF下载链接
+            session: 复用的HTTP会话（批量下载时传入以复用连接），为空时临时创建
+            update_buffer: 下载结果状态的写入缓冲（批量下载时合并写库），为空时立即写入
         
         Returns:
             下载后的文件路径，失败返回None
         """
-        # 更新状态为下载中
-        db.update_paper(arxiv_id, {'status': 'pdf_downloading'})
+        write = update_buffer.add if update_buffer is not None else db.update_paper
+        
+        async def update(arxiv_id: str, updates: dict):
+            # 写库（或缓冲区满时的批量写入）放到线程中执行，不阻塞并发的下载和分析
+            await asyncio.to_thread(write, arxiv_id, updates)
         
         pdf_filename = f"{arxiv_id}.pdf"
         pdf_path = self.download_path / pdf_filename
@@ -47,27 +103,23 @@ class PDFHandler:
         # 如果文件已存在，直接返回
         if pdf_path.exists():
             console.log(f"[yellow]PDF已存在: {pdf_filename}")
-            db.update_paper(arxiv_id, {
+            await update(arxiv_id, {
                 'status': 'pdf_downloaded',
                 'pdf_path': str(pdf_path)
             })
             return pdf_path
         
+        owns_session = session is None
+        if owns_session:
+            session = aiohttp.ClientSession()
+        
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(pdf_url, timeout=aiohttp.ClientTimeout(total=120)) as response:
-                    if response.status != 200:
-                        raise Exception(f"HTTP {response.status}")
-                    
-                    # 异步写入文件
-                    async with aiofiles.open(pdf_path, 'wb') as f:
-                        async for chunk in response.content.iter_chunked(8192):
-                            await f.write(chunk)
+            await self._fetch_pdf(session, pdf_url, pdf_path)
             
             # 验证文件
             if pdf_path.exists() and pdf_path.stat().st_size > 0:
                 console.log(f"[green]PDF下载成功: {pdf_filename}")
-                db.update_paper(arxiv_id, {
+                await update(arxiv_id, {
                     'status': 'pdf_downloaded',
                     'pdf_path': str(pdf_path)
                 })
@@ -77,11 +129,76 @@ class PDFHandler:
                 
         except Exception as e:
             console.log(f"[red]PDF下载失败 {arxiv_id}: {e}")
-            db.update_paper(arxiv_id, {'status': 'pdf_failed'})
+            await update(arxiv_id, {'status': 'pdf_failed'})
             # 清理失败的文件
             if pdf_path.exists():
                 pdf_path.unlink()
             return None
+        finally:
+            if owns_session:
+                await session.close()
+    
+    async def download_many(
+        self,
+        items: List[Tuple[str, str]],
+        concurrency: int = PDF_MAX_CONCURRENT_DOWNLOADS,
+        on_downloaded: Optional[Callable[[str, Path], Awaitable[None]]] = None
+    ) -> List[Optional[Path]]:
+        """
+        批量并发下载PDF，所有下载共享同一HTTP会话（复用连接）
+        
+        同一arXiv ID（如跨会话的同一篇论文）正在下载时不重复下载，直接等待进行中的下载结果，
+        on_downloaded 也只对实际下载的那一次调用
+        
+        Args:
+            items: (arxiv_id, pdf_url) 列表
+            concurrency: 最大并发下载数
+            on_downloaded: 每篇下载成功后立即调用的回调 on_downloaded(arxiv_id, pdf_path)
+        
+        Returns:
+            与items一一对应的文件路径，失败为None
+        """
+        semaphore = asyncio.BoundedSemaphore(concurrency)
+        update_buffer = UpdateBuffer(db)
+        loop = asyncio.get_running_loop()
+        
+        async def download_one(arxiv_id: str, pdf_url: str, session: aiohttp.ClientSession):
+            pending = self._in_flight.get(arxiv_id)
+            if pending is not None:
+                return await asyncio.shield(pending)
+            
+            future = loop.create_future()
+            self._in_flight[arxiv_id] = future
+            pdf_path = None
+            try:
+                async with semaphore:
+                    pdf_path = await self.download_pdf(
+                        arxiv_id, pdf_url, session=session, update_buffer=update_buffer
+                    )
+            finally:
+                del self._in_flight[arxiv_id]
+                future.set_result(pdf_path)
+            
+            if pdf_path is not None and on_downloaded is not None:
+                # 下游会继续更新该论文状态，先落库保证写入顺序
+                await asyncio.to_thread(update_buffer.flush)
+                await on_downloaded(arxiv_id, pdf_path)
+            return pdf_path
+        
+        connector = aiohttp.TCPConnector(limit=32, limit_per_host=concurrency, ttl_dns_cache=300)
+        try:
+            async with aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=120)
+            ) as session:
+                results = await asyncio.gather(
+                    *[download_one(arxiv_id, pdf_url, session) for arxiv_id, pdf_url in items],
+                    return_exceptions=True
+                )
+        finally:
+            await asyncio.to_thread(update_buffer.flush)
+        
+        return [None if isinstance(r, BaseException) else r for r in results]
     
     def extract_text(self, pdf_path) -> str:
         """
@@ -97,15 +214,34 @@ class PDFHandler:
         if isinstance(pdf_path, str):
             pdf_path = Path(pdf_path)
         
+        # 已解析过且PDF未更新时直接读取缓存的文本
+        txt_path = pdf_path.with_suffix('.txt')
+        try:
+            if txt_path.exists() and txt_path.stat().st_mtime >= pdf_path.stat().st_mtime:
+                return txt_path.read_text(encoding='utf-8')
+        except OSError:
+            pass
+        
+        import fitz  # PyMuPDF，延迟导入：仅解析时需要，避免拖慢CLI启动
+        
         try:
-            text = ""
-            with fitz.open(str(pdf_path)) as doc:
+            parts = []
+            with _FITZ_LOCK, fitz.open(str(pdf_path)) as doc:
                 for page_num, page in enumerate(doc):
-                    text += f"\n--- Page {page_num + 1} ---\n"
-                    text += page.get_text()
+                    parts.append(f"\n--- Page {page_num + 1} ---\n")
+                    # 纯文本模式且不做阅读顺序排序，LLM输入无需版面分析
+                    parts.append(page.get_text("text", sort=False))
             
             # 清理文本
-            text = self._clean_text(text)
+            text = self._clean_text(''.join(parts))
+            
+            # 缓存解析结果，后续分析不再重复解析PDF
+            if text:
+                try:
+                    with open(txt_path, 'w', encoding='utf-8', newline='\n') as f:
+                        f.write(text)
+                except OSError as e:
+                    console.log(f"[yellow]文本缓存写入失败 {txt_path.name}: {e}")
             
             console.log(f"[green]PDF解析成功: {pdf_path.name} ({len(text)} 字符)")
             return text
@@ -115,18 +251,8 @@ class PDFHandler:
             return ""
     
     def _clean_text(self, text: str) -> str:
-        """清理提取的文本"""
-        # 移除多余的空白字符
-        lines = text.split('\n')
-        cleaned_lines = []
-        
-        for line in lines:
-            line = line.strip()
-            # 跳过空行，但保留段落分隔
-            if line:
-                cleaned_lines.append(line)
-        
-        return '\n'.join(cleaned_lines)
+        """清理提取的文本：去除每行首尾空白并跳过空行"""
+        return _LINE_BREAK_RE.sub('\n', text).strip()
     
     def get_paper_text(self, arxiv_id: str) -> Optional[str]:
         """
@@ -138,18 +264,15 @@ class PDFHandler:
         Returns:
             论文文本内容
         """
-        # 检查是否已下载
-        paper = db.get_paper_by_arxiv_id(arxiv_id)
-        if not paper:
-            console.log(f"[red]论文不存在: {arxiv_id}")
-            return None
+        # 只查询PDF路径字段，检查是否已下载
+        pdf_path = db.get_pdf_path(arxiv_id)
         
         # 如果已有PDF路径，直接解析
-        if paper.get('pdf_path') and Path(paper['pdf_path']).exists():
-            return self.extract_text(Path(paper['pdf_path']))
+        if pdf_path and Path(pdf_path).exists():
+            return self.extract_text(Path(pdf_path))
         
         # 否则需要先下载
-        console.log(f"[yellow]PDF未下载，需要先下载: {arxiv_id}")
+        console.log(f"[yellow]PDF未下载（或论文不存在），需要先下载: {arxiv_id}")
         return None
     
     def delete_pdf(self, arxiv_id: str):
@@ -158,6 +281,23 @@ class PDFHandler:
         if pdf_path.exists():
             pdf_path.unlink()
             console.log(f"[yellow]已删除PDF: {pdf_path.name}")
+        
+        # 同时删除文本缓存
+        txt_path = pdf_path.with_suffix('.txt')
+        if txt_path.exists():
+            txt_path.unlink()
+
+
+# 进程内共享的PDF处理器（跨调用保留限速状态）
+_PDF_HANDLER: Optional[PDFHandler] = None
+
+
+def get_pdf_handler() -> PDFHandler:
+    """获取共享的PDFHandler实例"""
+    global _PDF_HANDLER
+    if _PDF_HANDLER is None:
+        _PDF_HANDLER = PDFHandler()
+    return _PDF_HANDLER
 
 
 # 便捷函数
@@ -172,7 +312,7 @@ async def download_paper_pdf(arxiv_id: str, pdf_url: str) -> Optional[Path]:
     Returns:
         下载后的文件路径
     """
-    handler = PDFHandler()
+    handler = get_pdf_handler()
     return await handler.download_pdf(arxiv_id, pdf_url)
 
 
@@ -186,5 +326,5 @@ def extract_paper_text(pdf_path: Path) -> str:
     Returns:
         提取的文本内容
     """
-    handler = PDFHandler()
+    handler = get_pdf_handler()
     return handler.extract_text(pdf_path)
@@ -0,0 +1,93 @@
+"""
+异步请求限速工具 - 按固定间隔均匀放行请求，支持根据Retry-After暂停
+"""
+import time
+import asyncio
+from typing import Mapping, Optional
+
+import aiohttp
+
+
+class AsyncRateLimiter:
+    """
+    异步限速器：每 time_period 秒最多放行 max_rate 个请求
+
+    用法：
+        limiter = AsyncRateLimiter(max_rate=1, time_period=3.0)
+        async with limiter:
+            ...
+    """
+
+    def __init__(self, max_rate: float, time_period: float = 1.0):
+        self._interval = time_period / max_rate
+        self._next_slot = 0.0
+
+    async def acquire(self):
+        """等待直到下一个可用的请求时间槽"""
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self._interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def pause(self, seconds: float):
+        """服务端要求退避时，推迟之后所有请求"""
+        self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+def retry_after_seconds(headers: Mapping[str, str], default: Optional[float] = None) -> Optional[float]:
+    """
+    解析响应头中的 Retry-After（仅支持秒数形式）
+
+    Args:
+        headers: 响应头
+        default: 缺失或无法解析时的返回值
+
+    Returns:
+        需要等待的秒数
+    """
+    value = headers.get('Retry-After')
+    if value is None:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return default
+
+
+class HTTPStatusError(Exception):
+    """HTTP响应状态码错误"""
+
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+class TransientRequestError(HTTPStatusError):
+    """可重试的请求错误：限流（429）、服务端错误（5xx）"""
+
+
+# 值得重试的异常：限流/服务端错误、网络错误、超时；其余4xx等永久错误立即失败
+RETRYABLE_ERRORS = (TransientRequestError, aiohttp.ClientError, asyncio.TimeoutError)
+
+
+def check_status(status: int):
+    """
+    检查响应状态码，非200时抛出异常
+
+    Raises:
+        TransientRequestError: 429或5xx，可重试
+        HTTPStatusError: 其他状态码（如403/404），不应重试
+    """
+    if status == 200:
+        return
+    if status == 429 or status >= 500:
+        raise TransientRequestError(status)
+    raise HTTPStatusError(status)